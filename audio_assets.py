@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Sons précompilés au format natif du mixer pygame, lus par projection mémoire sans décodage ni rééchantillonnage.
+
+Chaque fichier de sounds/ est décodé une fois par pygame au format MIXER_* et rangé dans PCM_DIRECTORY en PCM
+int16 entrelacé brut, derrière un en-tête qui porte le format, la taille, la date et l'empreinte SHA-256 de la
+source. Une source dont la taille ou la date a changé depuis est ignorée au profit du décodage habituel, jusqu'à la
+prochaine construction, qui ne recompile que si l'empreinte a changé :
+
+    python audio_assets.py
+"""
+
+import argparse
+import contextlib
+import hashlib
+import mmap
+import os
+import struct
+import time
+
+MAGIC = b"SHPC"
+VERSION = 1
+# magic, version, canaux, taille d'échantillon signée (-16), fréquence, images, taille et date (ns) de la source,
+# empreinte SHA-256 de la source ; complété à HEADER_SIZE octets, le PCM suit.
+HEADER = struct.Struct("<4sBBhIQQq32s")
+HEADER_SIZE = 128
+SOUND_DIRECTORY = "sounds"
+PCM_DIRECTORY = "pcm_cache"
+SOUND_EXTENSIONS = (".wav", ".flac", ".ogg", ".mp3")
+
+
+def pcm_path(path, directory=PCM_DIRECTORY):
+    # sounds/pas.wav -> pcm_cache/sounds/pas.wav.pcm
+    return os.path.join(directory, os.path.normpath(path) + ".pcm")
+
+
+def source_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as source_file:
+        for block in iter(lambda: source_file.read(1 << 20), b""):
+            digest.update(block)
+    return digest.digest()
+
+
+def unpack_header(data):
+    # En-tête d'un fichier PCM sous forme de dictionnaire, ou None s'il est tronqué ou invalide.
+    if len(data) < HEADER.size:
+        return None
+    magic, version, channels, sample_size, frequency, frame_count, source_size, source_mtime_ns, digest = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        return None
+    return {
+        "format": (frequency, sample_size, channels),
+        "frame_count": frame_count,
+        "source_size": source_size,
+        "source_mtime_ns": source_mtime_ns,
+        "digest": digest,
+    }
+
+
+def read_header(path):
+    try:
+        with open(path, "rb") as pcm_file:
+            return unpack_header(pcm_file.read(HEADER.size))
+    except OSError:
+        return None
+
+
+def pcm_end(header):
+    # Fin du PCM annoncé par l'en-tête, en octets depuis le début du fichier.
+    _, sample_size, channels = header["format"]
+    return HEADER_SIZE + header["frame_count"] * channels * (abs(sample_size) // 8)
+
+
+def source_header(mixer_format, frame_count, source, digest=None):
+    frequency, sample_size, channels = mixer_format
+    stat = os.stat(source)
+    return HEADER.pack(
+        MAGIC, VERSION, channels, sample_size, frequency, frame_count, stat.st_size, stat.st_mtime_ns,
+        digest if digest is not None else source_digest(source),
+    ).ljust(HEADER_SIZE, b"\0")
+
+
+def is_fresh(header, source):
+    # À l'exécution, seules la taille et la date de la source sont comparées : l'empreinte n'est relue qu'à la
+    # construction (build_assets), qui remet la date à jour quand le contenu n'a pas changé.
+    try:
+        stat = os.stat(source)
+    except OSError:
+        return False
+    return (stat.st_size, stat.st_mtime_ns) == (header["source_size"], header["source_mtime_ns"])
+
+
+@contextlib.contextmanager
+def open_pcm(source, mixer_format, directory=PCM_DIRECTORY):
+    # Vue mémoire sur le PCM précompilé de source s'il est à jour et au format mixer_format (pygame.mixer.get_init()),
+    # sinon None. La projection est refermée en sortie : pygame.mixer.Sound(buffer=...) copie les échantillons.
+    # Un fichier vide ou plus court que ce qu'annonce son en-tête est traité comme périmé.
+    try:
+        pcm_file = open(pcm_path(source, directory), "rb")
+    except OSError:
+        yield None
+        return
+    with pcm_file:
+        if os.fstat(pcm_file.fileno()).st_size < HEADER_SIZE:
+            yield None
+            return
+        with mmap.mmap(pcm_file.fileno(), 0, access=mmap.ACCESS_READ) as pcm_map:
+            header = unpack_header(pcm_map)
+            if header is None or header["format"] != tuple(mixer_format) or not is_fresh(header, source):
+                yield None
+                return
+            end = pcm_end(header)
+            if len(pcm_map) < end:
+                yield None
+                return
+            with memoryview(pcm_map)[HEADER_SIZE:end] as samples:
+                yield samples
+
+
+def compile_sound(mixer, source, path):
+    # Décode source au format courant du mixer et l'écrit dans path, en passant par un fichier temporaire.
+    samples = mixer.Sound(source).get_raw()
+    mixer_format = mixer.get_init()
+    _, sample_size, channels = mixer_format
+    header = source_header(mixer_format, len(samples) // (channels * (abs(sample_size) // 8)), source)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + ".tmp", "wb") as pcm_file:
+        pcm_file.write(header)
+        pcm_file.write(samples)
+    os.replace(path + ".tmp", path)
+    return len(samples)
+
+
+def is_complete(path, header):
+    return os.path.getsize(path) >= pcm_end(header)
+
+
+def build_assets(sound_directory=SOUND_DIRECTORY, directory=PCM_DIRECTORY, force=False):
+    # Compile les sons de sound_directory dont la source ou le format du mixer a changé.
+    # Renvoie (compilés, déjà à jour, en échec), listes de chemins des sources.
+    from audio_manager import init_pygame_mixer
+
+    pygame = init_pygame_mixer()
+    mixer = pygame.mixer
+    mixer_format = mixer.get_init()
+    compiled, fresh, failed = [], [], []
+    for root, _, names in os.walk(sound_directory):
+        for name in sorted(names):
+            if not name.lower().endswith(SOUND_EXTENSIONS):
+                continue
+            source = os.path.join(root, name)
+            path = pcm_path(source, directory)
+            header = read_header(path)
+            if not force and header is not None and header["format"] == mixer_format and is_complete(path, header):
+                if is_fresh(header, source):
+                    fresh.append(source)
+                    continue
+                # Date changée (copie, checkout) mais contenu identique : seule la date de l'en-tête est réécrite.
+                digest = source_digest(source)
+                if digest == header["digest"]:
+                    with open(path, "r+b") as pcm_file:
+                        pcm_file.write(source_header(mixer_format, header["frame_count"], source, digest))
+                    fresh.append(source)
+                    continue
+            try:
+                compile_sound(mixer, source, path)
+            except (pygame.error, OSError):
+                failed.append(source)
+            else:
+                compiled.append(source)
+    return compiled, fresh, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Précompile les sons au format PCM natif du mixer pygame.")
+    parser.add_argument("--sounds", default=SOUND_DIRECTORY, help="répertoire des sons sources")
+    parser.add_argument("--output", default=PCM_DIRECTORY, help="répertoire des fichiers PCM")
+    parser.add_argument("--force", action="store_true", help="recompile même les sons à jour")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    compiled, fresh, failed = build_assets(args.sounds, args.output, args.force)
+    for source in failed:
+        print(f"Erreur lors de la compilation du son : {source}")
+    print(f"{len(compiled)} sons compilés, {len(fresh)} à jour en {time.perf_counter() - start:.2f} s : {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,142 +1,540 @@
-import pygame
 import time
+import math
 import threading
-import queue
+import heapq
+import itertools
+import collections
 import sys
 
-pygame.mixer.init()
+import numpy
+
+from audio_assets import PCM_DIRECTORY, open_pcm
+
+# Format du mixer pygame ; tampon augmenté pour une meilleure stabilité audio.
+MIXER_FREQUENCY = 44100
+MIXER_SIZE = -16
+MIXER_CHANNELS = 2
+MIXER_BUFFER = 4096
+
+
+def init_pygame_mixer():
+    # pygame n'est importé et son mixer ouvert qu'une fois, au premier PygameBackend : importer ce module ne coûte
+    # rien aux outils qui ne jouent pas par pygame (software_mixer.py, benchmarks.py) ni à l'écran de chargement du jeu.
+    import pygame
+
+    if pygame.mixer.get_init() is None:
+        pygame.mixer.init(MIXER_FREQUENCY, MIXER_SIZE, MIXER_CHANNELS, MIXER_BUFFER)
+    return pygame
+
+
+def pan_volumes(panoramique):
+    # Loi à puissance constante ramenée à 1 au centre : un son centré garde son volume sur les deux côtés
+    # (la répartition linéaire le baissait de 6 dB), un son sur un bord est muet de l'autre côté.
+    angle = min(max(panoramique, 0.0), 1.0) * math.pi / 2
+    return min(1.0, math.sqrt(2) * math.cos(angle)), min(1.0, math.sqrt(2) * math.sin(angle))
 
 class SoundEvent:
-    def __init__(self, timestamp, path, volume, panoramique, character_id=None):
+    def __init__(self, timestamp, path, volume, panoramique, character_id=None, priority=0):
         self.timestamp = timestamp
         self.path = path
         self.volume = volume
         self.panoramique = panoramique
         self.character_id = character_id
+        self.priority = priority
+
+class PygameBackend:
+    # Sortie audio par pygame.mixer : canaux du mixer pour les effets, flux musique pour l'ambiance.
+    # Toute autre sortie (voir software_mixer.py) expose les mêmes méthodes et des canaux de même interface
+    # (play, stop, get_busy, set_volume) pour être utilisée par SoundCache et AudioPlayer.
+    # Un son précompilé par audio_assets.py dans pcm_directory est lu par projection mémoire, sans décodage ;
+    # à défaut (absent, périmé, autre format de mixer), pygame décode la source. pcm_directory=None décode toujours.
+    def __init__(self, pcm_directory=PCM_DIRECTORY):
+        pygame = init_pygame_mixer()
+        self.mixer = pygame.mixer
+        self.load_errors = (pygame.error, FileNotFoundError)
+        self.pcm_directory = pcm_directory
+
+    def load_sound(self, path):
+        if self.pcm_directory is not None:
+            with open_pcm(path, self.mixer.get_init(), self.pcm_directory) as samples:
+                if samples is not None:
+                    return self.mixer.Sound(buffer=samples)
+        return self.mixer.Sound(path)
+
+    def sound_size(self, sound):
+        # Taille du PCM décodé, déduite de la durée et du format du mixer.
+        frequency, sample_format, channels = self.mixer.get_init()
+        return int(sound.get_length() * frequency) * channels * (abs(sample_format) // 8)
+
+    def set_num_channels(self, count):
+        self.mixer.set_num_channels(count)
+
+    def get_num_channels(self):
+        return self.mixer.get_num_channels()
+
+    def channel(self, index):
+        return self.mixer.Channel(index)
+
+    def load_music(self, path):
+        self.mixer.music.load(path)
+
+    def play_music(self, loops=-1):
+        self.mixer.music.play(loops=loops)
+
+    def set_music_volume(self, volume):
+        self.mixer.music.set_volume(volume)
+
+    def stop_music(self):
+        self.mixer.music.stop()
+
+    def is_music_playing(self):
+        return self.mixer.music.get_busy()
+
+class SoundCache:
+    # Cache partagé des sons décodés, indexé par chemin, avec éviction LRU sous un budget mémoire en octets.
+    # Les sons déclarés sont préchargés pour qu'aucun événement ne paie le décodage au moment de sa lecture.
+    def __init__(self, budget_bytes=64 * 1024 * 1024, backend=None):
+        self.backend = backend if backend is not None else PygameBackend()
+        self.budget_bytes = budget_bytes
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._sounds = collections.OrderedDict() # chemin -> (son, taille en octets), du plus ancien au plus récent
+        self._lock = threading.Lock()
+
+    def sound_size(self, sound):
+        return self.backend.sound_size(sound)
+
+    def get(self, path):
+        with self._lock:
+            entry = self._sounds.get(path)
+            if entry is not None:
+                self._sounds.move_to_end(path)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        # Décodage hors du verrou, le son est inséré ensuite (lève une des erreurs backend.load_errors).
+        sound = self.backend.load_sound(path)
+        self._insert(path, sound)
+        return sound
+
+    def preload(self, paths):
+        # Décode d'avance les sons déclarés ; renvoie les chemins qui n'ont pas pu être chargés.
+        failed = []
+        for path in paths:
+            if path in self:
+                continue
+            try:
+                self._insert(path, self.backend.load_sound(path))
+            except self.backend.load_errors:
+                failed.append(path)
+        return failed
+
+    def _insert(self, path, sound):
+        size = self.sound_size(sound)
+        with self._lock:
+            previous = self._sounds.pop(path, None)
+            if previous is not None:
+                self.size_bytes -= previous[1]
+            self._sounds[path] = (sound, size)
+            self.size_bytes += size
+            # Le son qui vient d'être inséré est conservé même s'il dépasse seul le budget.
+            while self.size_bytes > self.budget_bytes and len(self._sounds) > 1:
+                _, (_, evicted_size) = self._sounds.popitem(last=False)
+                self.size_bytes -= evicted_size
+                self.evictions += 1
+
+    def __contains__(self, path):
+        with self._lock:
+            return path in self._sounds
+
+    def __len__(self):
+        with self._lock:
+            return len(self._sounds)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._sounds),
+                "size_bytes": self.size_bytes,
+                "budget_bytes": self.budget_bytes,
+            }
+
+class AudioTelemetry:
+    # Mesures du thread audio : retard entre le timestamp d'un SoundEvent et l'appel effectif à Channel.play,
+    # profondeur de la file au moment de la lecture et vols de voix dans le pool général.
+    # Un seul écrivain (le thread audio) remplit des tampons circulaires numpy sans verrou ; les lecteurs
+    # en prennent une copie, au pire décalée d'un événement.
+    LATENESS_BUCKETS = (0.0, 0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, float("inf"))
+
+    def __init__(self, capacity=4096):
+        self.capacity = capacity
+        self.lateness = numpy.zeros(capacity)
+        self.queue_depth = numpy.zeros(capacity, dtype=numpy.int32)
+        self.count = 0 # Nombre total d'événements mesurés ; l'emplacement suivant est count % capacity
+        self.voice_steals = 0
+        self.voice_rejections = 0
+        self.late_drops = 0
+
+    def record(self, lateness, queue_depth):
+        index = self.count % self.capacity
+        self.lateness[index] = lateness
+        self.queue_depth[index] = queue_depth
+        self.count += 1
+
+    def record_voice_steal(self):
+        self.voice_steals += 1
+
+    def record_voice_rejection(self):
+        self.voice_rejections += 1
+
+    def record_late_drop(self):
+        self.late_drops += 1
+
+    def window(self):
+        # Copie des mesures encore présentes dans le tampon (les capacity dernières).
+        count = self.count
+        size = min(count, self.capacity)
+        return self.lateness[:size].copy(), self.queue_depth[:size].copy()
+
+    def histogram(self):
+        lateness, _ = self.window()
+        counts, _ = numpy.histogram(lateness, bins=self.LATENESS_BUCKETS)
+        return list(zip(self.LATENESS_BUCKETS[1:], counts.tolist()))
+
+    def snapshot(self):
+        lateness, queue_depth = self.window()
+        stats = {"events": self.count, "voice_steals": self.voice_steals, "voice_rejections": self.voice_rejections, "late_drops": self.late_drops}
+        if len(lateness):
+            p50, p90, p99 = numpy.percentile(lateness, (50, 90, 99))
+            stats.update({
+                "lateness_p50_s": float(p50),
+                "lateness_p90_s": float(p90),
+                "lateness_p99_s": float(p99),
+                "lateness_max_s": float(lateness.max()),
+                "jitter_s": float(lateness.std()),
+                "queue_depth_max": int(queue_depth.max()),
+                "queue_depth_mean": float(queue_depth.mean()),
+            })
+        return stats
+
+class VoiceManager:
+    # Pool général de voix (canaux à partir de first_channel) attribuées par priorité.
+    # Un canal libre est pris en premier ; sinon le pool grandit jusqu'à max_voices, puis la voix de plus basse
+    # priorité, et à priorité égale la plus ancienne, est volée si elle ne dépasse pas la priorité du nouveau son.
+    # Sinon le son est refusé. L'occupation se déduit des fins de lecture prévues, sans interroger les canaux.
+    def __init__(self, backend, first_channel, telemetry, min_voices=2, max_voices=8):
+        self.backend = backend
+        self.first_channel = first_channel
+        self.telemetry = telemetry
+        self.min_voices = min_voices
+        self.max_voices = max_voices
+        self.voices = [] # [canal, priorité, début, fin prévue] par voix du pool
+        self.grows = 0
+        self.shrinks = 0
+        self._resize(min_voices)
+
+    def _resize(self, count):
+        self.backend.set_num_channels(self.first_channel + count)
+        del self.voices[count:]
+        for index in range(len(self.voices), count):
+            self.voices.append([self.backend.channel(self.first_channel + index), 0, 0.0, 0.0])
+
+    def active_count(self, now):
+        return sum(1 for voice in self.voices if voice[3] > now)
+
+    def allocate(self, priority, now, length):
+        # Renvoie le canal sur lequel jouer un son de cette priorité et de cette durée, ou None s'il est refusé.
+        free_voices = [voice for voice in self.voices if voice[3] <= now]
+        if not free_voices and len(self.voices) < self.max_voices:
+            self._resize(len(self.voices) + 1)
+            self.grows += 1
+            free_voices = self.voices[-1:]
+
+        if free_voices:
+            voice = free_voices[0]
+        else:
+            voice = min(self.voices, key=lambda voice: (voice[1], voice[2]))
+            if voice[1] > priority:
+                self.telemetry.record_voice_rejection()
+                return None
+            self.telemetry.record_voice_steal()
+
+        voice[1:] = [priority, now, now + length]
+        self._shrink(now)
+        return voice[0]
+
+    def _shrink(self, now):
+        # Rend au mixer les voix libres en fin de pool au-delà de min_voices.
+        count = len(self.voices)
+        while count > self.min_voices and self.voices[count - 1][3] <= now:
+            count -= 1
+        if count < len(self.voices):
+            self._resize(count)
+            self.shrinks += 1
+
+    def stats(self, now):
+        return {
+            "voices": len(self.voices),
+            "active": self.active_count(now),
+            "grows": self.grows,
+            "shrinks": self.shrinks,
+            "steals": self.telemetry.voice_steals,
+            "rejections": self.telemetry.voice_rejections,
+        }
+
+class SoundScheduler:
+    # File d'attente des événements sonores triée par timestamp (tas + condition), qui remplace la FIFO :
+    # un événement en retard n'attend plus derrière un événement prévu plus tard.
+    # Avec coalesce, un nouvel événement d'un personnage remplace celui qu'il avait encore en attente :
+    # si le thread audio prend du retard, seul le dernier bruit de pas de chaque personnage reste à jouer.
+    def __init__(self, coalesce=True):
+        self.coalesce = coalesce
+        self.coalesced = 0 # Événements remplacés avant d'avoir été joués
+        self._heap = [] # [timestamp, compteur, événement] ; l'événement vaut None une fois remplacé
+        self._counter = itertools.count() # Départage les timestamps égaux dans l'ordre d'arrivée
+        self._pending = {} # character_id -> entrée du dernier événement en attente de ce personnage
+        self._size = 0
+        self._condition = threading.Condition()
+
+    def put(self, sound_event):
+        self.put_many((sound_event,))
+
+    def put_many(self, sound_events):
+        # Ajoute un lot d'événements (par exemple les pas de tous les personnages d'un tick) sous un seul verrou.
+        # Un lot vide, le cas de la plupart des ticks, ne réveille pas le thread audio.
+        with self._condition:
+            pushed = False
+            for sound_event in sound_events:
+                pushed = True
+                entry = [sound_event.timestamp, next(self._counter), sound_event]
+                if self.coalesce and sound_event.character_id is not None:
+                    previous = self._pending.get(sound_event.character_id)
+                    if previous is not None and previous[2] is not None:
+                        previous[2] = None
+                        self._size -= 1
+                        self.coalesced += 1
+                    self._pending[sound_event.character_id] = entry
+                heapq.heappush(self._heap, entry)
+                self._size += 1
+            if pushed:
+                self._condition.notify()
+
+    def qsize(self):
+        with self._condition:
+            return self._size
+
+    def empty(self):
+        return self.qsize() == 0
+
+    def _discard_replaced(self):
+        while self._heap and self._heap[0][2] is None:
+            heapq.heappop(self._heap)
+
+    def next_timestamp(self):
+        # Timestamp du prochain événement en attente, ou None si la file est vide.
+        with self._condition:
+            self._discard_replaced()
+            return self._heap[0][0] if self._heap else None
+
+    def wake(self):
+        # Réveille le thread en attente, par exemple pour qu'il constate son arrêt.
+        with self._condition:
+            self._condition.notify_all()
+
+    def get_due(self, clock, timeout=None):
+        # Attend l'échéance du prochain événement, l'arrivée d'un nouveau ou la fin de timeout,
+        # puis renvoie d'un coup tous les événements échus, dans l'ordre de leurs timestamps.
+        with self._condition:
+            self._discard_replaced()
+            delay = self._heap[0][0] - clock() if self._heap else None
+            if delay is None or delay > 0:
+                if timeout is not None:
+                    delay = timeout if delay is None else min(delay, timeout)
+                self._condition.wait(delay)
+
+            current_time = clock()
+            due_events = []
+            while self._heap and self._heap[0][0] <= current_time:
+                entry = heapq.heappop(self._heap)
+                sound_event = entry[2]
+                if sound_event is None:
+                    continue
+                self._size -= 1
+                if self._pending.get(sound_event.character_id) is entry:
+                    del self._pending[sound_event.character_id]
+                due_events.append(sound_event)
+            return due_events
 
 class AudioPlayer(threading.Thread):
     # Thread dédié à la lecture des sons, gérant la musique d'ambiance, les effets sonores par personnage
-    # et un système de fondu (ducking) pour l'ambiance
-    def __init__(self, audio_queue):
+    # et un système de fondu (ducking) pour l'ambiance.
+    # La sortie est celle du cache de sons (pygame.mixer par défaut) ; une horloge peut remplacer le temps réel
+    # pour piloter le lecteur hors temps réel, comme le fait le rendu WAV de software_mixer.py.
+    def __init__(self, audio_queue, sound_cache=None, sequence_start_time_ns=None, clock=None, max_lateness=0.1):
         super().__init__()
         self.audio_queue = audio_queue
+        self.sound_cache = sound_cache if sound_cache is not None else SoundCache()
+        self.backend = self.sound_cache.backend
+        self.clock = clock
+        # Retard (s) au-delà duquel un son de personnage n'est plus joué : mieux vaut un pas manquant qu'un pas décalé.
+        # None désactive l'abandon ; les sons sans personnage (victoire, fin de partie) sont toujours joués.
+        self.max_lateness = max_lateness
+        self.telemetry = AudioTelemetry()
+        # Origine des timestamps des SoundEvent ; le jeu peut passer la sienne pour mesurer le décalage exact.
+        if sequence_start_time_ns is None:
+            sequence_start_time_ns = time.perf_counter_ns()
+        self.sequence_start_time_ns = sequence_start_time_ns
         self.running = True
         self.daemon = True
         
-        self.ambient_channel = pygame.mixer.Channel(0) # Canal dédié à la musique de fond.
+        self.ambient_channel = self.backend.channel(0) # Canal dédié à la musique de fond.
+        self.ambient_streamed = False # Vrai quand l'ambiance est lue en flux par pygame.mixer.music
         
         # Canaux dédiés aux bruits de pas de chaque personnage pour éviter les coupures entre eux.
         self.character_footstep_channels = {
-            'son': pygame.mixer.Channel(1),
-            'father': pygame.mixer.Channel(2),
+            'son': self.backend.channel(1),
+            'father': self.backend.channel(2),
         }
-        # Définit le nombre total de canaux Pygame pour inclure les canaux dédiés et un pool général
-        pygame.mixer.set_num_channels(5) 
-        # Pool de canaux pour les effets sonores généraux (victoire, fin de partie), utilisant le "voice stealing"
-        self.general_fx_channels = [pygame.mixer.Channel(i) for i in range(3, pygame.mixer.get_num_channels())]
-        self.next_general_fx_channel_index = 0
+        # Pool de voix pour les effets sonores généraux (victoire, fin de partie) et les personnages sans canal dédié,
+        # après les canaux dédiés ; le nombre total de canaux du mixer suit la taille du pool.
+        self.voices = VoiceManager(self.backend, 3, self.telemetry, min_voices=2, max_voices=8)
 
         self.original_ambient_volume = 0.0
         self.duck_level = 0.7 # Niveau de réduction du volume de l'ambiance pendant le ducking
         
-        self._last_fx_played_time = 0.0
         self._fx_hold_time = 0.25 # Durée pendant laquelle l'ambiance reste atténuée après un FX
         self._fade_duration = 0.2 # Durée du fondu d'entrée/sortie du ducking
+        self._fade_steps = 4 # Nombre de paliers de volume pour parcourir le fondu
+
+        # Enveloppe du ducking calculée à partir des débuts et durées des sons joués, sans interroger les canaux.
+        self._ambient_volume = 0.0 # Dernier volume appliqué au canal d'ambiance
+        self._duck_until = 0.0 # Instant (sequence_time) jusqu'auquel l'ambiance doit rester atténuée
+        self._next_fade_step_time = 0.0
 
-    def start_ambient(self, path, volume):
+    def start_ambient(self, path, volume, stream=True):
+        # En mode flux, la piste passe par le flux musique du mixer : elle est décodée au fil de la lecture,
+        # la mémoire reste constante quelle que soit sa durée et le démarrage n'attend pas son décodage.
         try:
-            ambient_sound = pygame.mixer.Sound(path)
-            self.original_ambient_volume = volume
-            self.ambient_channel.set_volume(self.original_ambient_volume)
+            if stream:
+                self.backend.load_music(path)
+            else:
+                ambient_sound = self.backend.load_sound(path)
+        except self.backend.load_errors:
+            return
+
+        self.ambient_streamed = stream
+        self.original_ambient_volume = volume
+        self._ambient_volume = volume
+        self.set_ambient_volume(self.original_ambient_volume)
+        if stream:
+            self.backend.play_music(loops=-1)
+        else:
             self.ambient_channel.play(ambient_sound, loops=-1)
-        except pygame.error:
-            pass
+
+    def set_ambient_volume(self, volume):
+        if self.ambient_streamed:
+            self.backend.set_music_volume(volume)
+        else:
+            self.ambient_channel.set_volume(volume)
 
     def stop_ambient(self):
-        self.ambient_channel.stop()
+        if self.ambient_streamed:
+            self.backend.stop_music()
+        else:
+            self.ambient_channel.stop()
 
     def is_ambient_playing(self):
+        if self.ambient_streamed:
+            return self.backend.is_music_playing()
         return self.ambient_channel.get_busy()
 
-    def run(self):
-        self.sequence_start_time_ns = time.perf_counter_ns()
-        last_volume_update_time = time.perf_counter()
+    def stop(self):
+        self.running = False
+        self.audio_queue.wake()
 
-        while self.running:
-            current_real_time = time.perf_counter()
-            delta_time = current_real_time - last_volume_update_time
-            last_volume_update_time = current_real_time
-
-            # Détermine si un effet sonore est actif pour déclencher le ducking de l'ambiance.
-            fx_channel_busy = False
-            for channel in self.character_footstep_channels.values():
-                if channel.get_busy():
-                    fx_channel_busy = True
-                    break
-            if not fx_channel_busy:
-                for channel in self.general_fx_channels:
-                    if channel.get_busy():
-                        fx_channel_busy = True
-                        break
-
-            # Ajuste le volume de la musique d'ambiance en fonction de l'activité des effets sonores
-            target_ambient_volume = self.original_ambient_volume
-            if fx_channel_busy or (current_real_time - self._last_fx_played_time < self._fx_hold_time):
-                target_ambient_volume = self.original_ambient_volume * self.duck_level
-            
-            # Applique un fondu progressif au volume de l'ambiance
-            current_ambient_volume = self.ambient_channel.get_volume()
-            if abs(current_ambient_volume - target_ambient_volume) > 0.005:
-                if self._fade_duration > 0:
-                    volume_change_rate = (target_ambient_volume - current_ambient_volume) / self._fade_duration
-                    new_volume = current_ambient_volume + volume_change_rate * delta_time
-                    new_volume = max(min(new_volume, self.original_ambient_volume), self.original_ambient_volume * self.duck_level)
-                    self.ambient_channel.set_volume(new_volume)
+    def sequence_time(self):
+        # Temps écoulé depuis le début de la séquence, dans l'unité des timestamps des SoundEvent.
+        if self.clock is not None:
+            return self.clock()
+        return (time.perf_counter_ns() - self.sequence_start_time_ns) / 1_000_000_000
+
+    def update_ambient_ducking(self, current_real_time):
+        # Avance l'enveloppe de ducking d'au plus un palier de volume.
+        # Renvoie le délai avant le prochain changement à appliquer, ou None si rien n'est prévu.
+        if self.original_ambient_volume <= 0:
+            return None
+
+        ducked_volume = self.original_ambient_volume * self.duck_level
+        ducking = current_real_time < self._duck_until
+        target_ambient_volume = ducked_volume if ducking else self.original_ambient_volume
+
+        if abs(self._ambient_volume - target_ambient_volume) <= 0.005:
+            # Volume atteint : prochain réveil à la fin de l'atténuation, pour remonter l'ambiance.
+            return self._duck_until - current_real_time if ducking else None
+
+        if current_real_time < self._next_fade_step_time:
+            return self._next_fade_step_time - current_real_time
+
+        # Fondu en paliers réguliers entre le volume d'origine et le volume atténué
+        steps = max(1, self._fade_steps)
+        volume_step = (self.original_ambient_volume - ducked_volume) / steps
+        if target_ambient_volume < self._ambient_volume:
+            new_volume = max(target_ambient_volume, self._ambient_volume - volume_step)
+        else:
+            new_volume = min(target_ambient_volume, self._ambient_volume + volume_step)
+        self._ambient_volume = new_volume
+        self.set_ambient_volume(new_volume)
+        self._next_fade_step_time = current_real_time + self._fade_duration / steps
+        if abs(new_volume - target_ambient_volume) <= 0.005:
+            return self._duck_until - current_real_time if ducking else None
+        return self._fade_duration / steps
+
+    def play_event(self, sound_event):
+        lateness = self.sequence_time() - sound_event.timestamp
+        if self.max_lateness is not None and sound_event.character_id is not None and lateness > self.max_lateness:
+            self.telemetry.record_late_drop()
+            return
+
+        try:
+            if isinstance(sound_event.path, str):
+                sound = self.sound_cache.get(sound_event.path)
             else:
-                self.ambient_channel.set_volume(target_ambient_volume)
+                sound = sound_event.path
+        except self.backend.load_errors:
+            return
+
+        sound.set_volume(sound_event.volume)
+
+        # Selection auto canal
+        channel_to_play = None
+        if sound_event.character_id and sound_event.character_id in self.character_footstep_channels:
+            channel_to_play = self.character_footstep_channels[sound_event.character_id]
+        else:
+            channel_to_play = self.voices.allocate(sound_event.priority, self.sequence_time(), sound.get_length())
 
+        if channel_to_play:
+            self.telemetry.record(self.sequence_time() - sound_event.timestamp, self.audio_queue.qsize())
+            channel_to_play.play(sound)
+            # L'ambiance reste atténuée pendant toute la durée connue du son, plus le temps de maintien.
+            self._duck_until = max(self._duck_until, self.sequence_time() + sound.get_length() + self._fx_hold_time)
+            # Applique l'effet panoramique pour la spatialisation du son ; le volume de l'événement est déjà
+            # porté par le son, le canal ne fait que le répartir entre gauche et droite.
+            left_pan_vol, right_pan_vol = pan_volumes(sound_event.panoramique)
+            channel_to_play.set_volume(left_pan_vol, right_pan_vol)
+
+    def run(self):
+        while self.running:
             try:
-                # Récupère un événement sonore de la file d'attente
-                sound_event = self.audio_queue.get(timeout=0.001) 
-                
-                self._last_fx_played_time = current_real_time
-
-                # Synchronise le temps de lecture du son avec le temps de jeu
-                absolute_target_time_ns = self.sequence_start_time_ns + sound_event.timestamp * 1_000_000_000
-                delta_time_ns_for_sleep = absolute_target_time_ns - time.perf_counter_ns()
-                time_to_wait_s = max(0, delta_time_ns_for_sleep / 1_000_000_000)
-                
-                if time_to_wait_s > 0:
-                    time.sleep(time_to_wait_s)
-
-                try:
-                    if isinstance(sound_event.path, pygame.mixer.Sound):
-                        sound = sound_event.path
-                    else:
-                        sound = pygame.mixer.Sound(sound_event.path)
-                except pygame.error:
-                    continue
-                
-                sound.set_volume(sound_event.volume)
-                
-                # Selection auto canal
-                channel_to_play = None
-                if sound_event.character_id and sound_event.character_id in self.character_footstep_channels:
-                    channel_to_play = self.character_footstep_channels[sound_event.character_id]
-                elif self.general_fx_channels:
-                    channel_to_play = self.general_fx_channels[self.next_general_fx_channel_index]
-                    self.next_general_fx_channel_index = (self.next_general_fx_channel_index + 1) % len(self.general_fx_channels)
-
-                if channel_to_play:
-                    channel = channel_to_play.play(sound) 
-                    if channel:
-                        # Applique l'effet panoramique pour la spatialisation du son
-                        left_pan_vol = 1.0 - sound_event.panoramique
-                        right_pan_vol = sound_event.panoramique
-                        channel.set_volume(left_pan_vol * sound_event.volume, right_pan_vol * sound_event.volume)
-
-            except queue.Empty:
-                pass
+                # Dort jusqu'au prochain événement dû ou au prochain palier de fondu, jamais en scrutant les canaux.
+                timeout = self.update_ambient_ducking(self.sequence_time())
+                for sound_event in self.audio_queue.get_due(self.sequence_time, timeout):
+                    self.play_event(sound_event)
             except Exception as e:
                 self.running = False
         sys.exit()
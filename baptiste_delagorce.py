@@ -6,52 +6,56 @@ Created on Mon Jul  7 10:45:42 2025
 @author: smartaudiotools
 """
 
+import time
+# Origine des mesures de démarrage, prise avant les imports lourds.
+STARTUP_ORIGIN_NS = time.perf_counter_ns()
 import pyxel
 import numpy
-import random
-import time
-import queue
 import sys
-import pygame
-from audio_manager import SoundEvent, AudioPlayer
-
-# Taille de tampon augmentée pour une meilleure stabilité audio
-pygame.mixer.pre_init(44100, -16, 2, 4096)
-pygame.mixer.init()
-
-SCREEN_WIDTH = 640
-SCREEN_HEIGHT = 480
-SPEED = 2
-
-TILE_SIZE = 8
-PATH_SIZE = TILE_SIZE * 2
-LABYRINTH_WIDTH = SCREEN_WIDTH // PATH_SIZE
-LABYRINTH_HEIGHT = SCREEN_HEIGHT // PATH_SIZE
-
-if LABYRINTH_WIDTH % 4 != 3:
-    LABYRINTH_WIDTH = LABYRINTH_WIDTH // 4 * 4 - 1
-if LABYRINTH_HEIGHT % 4 != 3:
-    LABYRINTH_HEIGHT = LABYRINTH_HEIGHT // 4 * 4 - 1
-
-LABYRINTH_START_POSITION = (0, LABYRINTH_HEIGHT // 2)
-LABYRINTH_END_POSITION = (LABYRINTH_WIDTH - 1, LABYRINTH_HEIGHT // 2)
+import random
+import argparse
+import threading
+from audio_manager import SoundEvent, SoundCache, SoundScheduler, AudioPlayer
+from replay import InputRecorder, InputLog
+from profiler import FrameProfiler, StartupTimer
+from labyrinth_store import MazeStore
+from labyrinth_core import (
+    SCREEN_WIDTH,
+    SCREEN_HEIGHT,
+    FPS,
+    PATH_SIZE,
+    LABYRINTH_WIDTH,
+    LABYRINTH_HEIGHT,
+    LABYRINTH_TO_MAP_SCALE,
+    LEFT,
+    RIGHT,
+    UP,
+    DOWN,
+    MOVE_RIGHT,
+    MOVE_LEFT,
+    MOVE_UP,
+    MOVE_DOWN,
+    FOOTSTEP_SOUND_PATHS,
+    VICTORY_SOUND_PATH,
+    GAME_OVER_SOUND_PATH,
+    AMBIENT_SOUND_PATH,
+    AMBIENT_VOLUME,
+    GAME_OVER_TIMEOUT,
+    CAUGHT_SOUND_PATH,
+    LabyrinthModel,
+    ChunkedLabyrinthModel,
+    CharacterModel,
+    FootprintTrail,
+    Simulation,
+    Pursuit,
+    default_algorithm,
+)
 
 RESOURCE_PATH = "labyrinth_resource.pyxres"
 
-LABYRINTH_TO_MAP_SCALE = 2
-MAP_WIDTH = LABYRINTH_WIDTH * LABYRINTH_TO_MAP_SCALE
-MAP_HEIGHT = LABYRINTH_HEIGHT * LABYRINTH_TO_MAP_SCALE
-
-LABYRINTH_TO_SCREEN_SCALE = 16
-
-HORIZONTAL = 1
-VERTICAL = 2
-LEFT = 1
-RIGHT = 2
-UP = 3
-DOWN = 4
-
-class Character:
+class Character(CharacterModel):
+    # Adaptateur pyxel d'un personnage : clavier en entrée, sprite en sortie.
+    # Les règles de déplacement sont dans CharacterModel.step.
     def __init__(
         self,
         position,
@@ -66,137 +70,28 @@ class Character:
         image_index=1,
         transparent_color=0,
     ):
-        self.x = position[0] * LABYRINTH_TO_SCREEN_SCALE
-        self.y = position[1] * LABYRINTH_TO_SCREEN_SCALE
-        self.direction = direction
-
-        self.traces = []
-        self.moving = False
+        super().__init__(position, labyrinth, character_id, direction)
         self.frame = 0
-        self.exited = False
 
         self.key_right = key_right
         self.key_left = key_left
         self.key_up = key_up
         self.key_down = key_down
-        self.labyrinth = labyrinth
         self.image = pyxel.images[image_index]
         self.transparent_color = transparent_color
-        self.character_id = character_id 
         self.app_instance = app_instance 
 
-        self.last_sound_position = (self.x // PATH_SIZE, self.y // PATH_SIZE)
-        self.footstep_index = 0
-
-    def update(self):
-        if self.exited:
-            return
-
-        x = self.x
-        y = self.y
-        labyrinth_array = self.labyrinth.labyrinth_array
-        labyrinth_map = self.labyrinth.map
-        direction = None
-
-        current_grid_x = x // PATH_SIZE
-        current_grid_y = y // PATH_SIZE
-
-        if (current_grid_x, current_grid_y) == LABYRINTH_END_POSITION:
-            self.exited = True
-            return
-
+    def read_keys(self):
+        keys = 0
         if pyxel.btn(self.key_right):
-            new_x = x + SPEED
-            if current_grid_x == LABYRINTH_WIDTH - 1:
-                new_x = min(new_x, (LABYRINTH_WIDTH - 1) * PATH_SIZE)
-            else:
-                next_col_idx = current_grid_x + 1
-                if (labyrinth_array[next_col_idx, current_grid_y] or 
-                    labyrinth_array[next_col_idx, (y + PATH_SIZE - 1) // PATH_SIZE]):
-                    new_x = current_grid_x * PATH_SIZE
-            if new_x != x:
-                if new_x // PATH_SIZE != current_grid_x:
-                    self.traces.append([current_grid_x, current_grid_y, HORIZONTAL])
-                labyrinth_map.pset(x // TILE_SIZE + 1, y // TILE_SIZE + 1, (8, 1))
-                labyrinth_map.pset(x // TILE_SIZE + 1, y // TILE_SIZE, (9, 1))
-                x = new_x
-                direction = RIGHT
-
-        elif pyxel.btn(self.key_left):
-            new_x = x - SPEED
-            if new_x < 0:
-                new_x = 0
-            else:
-                next_col_idx = new_x // PATH_SIZE
-                if (labyrinth_array[next_col_idx, current_grid_y] or 
-                    labyrinth_array[next_col_idx, (y + PATH_SIZE - 1) // PATH_SIZE]):
-                    new_x = (next_col_idx + 1) * PATH_SIZE
-            if new_x != x:
-                if new_x // PATH_SIZE != current_grid_x:
-                    self.traces.append([current_grid_x, current_grid_y, HORIZONTAL])
-                labyrinth_map.pset(new_x // TILE_SIZE + 1, y // TILE_SIZE + 1, (8, 1))
-                labyrinth_map.pset(new_x // TILE_SIZE + 1, y // TILE_SIZE, (9, 1))
-                x = new_x
-                direction = LEFT
-
+            keys |= MOVE_RIGHT
+        if pyxel.btn(self.key_left):
+            keys |= MOVE_LEFT
+        if pyxel.btn(self.key_up):
+            keys |= MOVE_UP
         if pyxel.btn(self.key_down):
-            new_y = y + SPEED
-            if current_grid_y == LABYRINTH_HEIGHT - 1:
-                new_y = min(new_y, (LABYRINTH_HEIGHT - 1) * PATH_SIZE)
-            else:
-                next_row_idx = current_grid_y + 1
-                if (labyrinth_array[current_grid_x, next_row_idx] or 
-                    labyrinth_array[(x + PATH_SIZE - 1) // PATH_SIZE, next_row_idx]):
-                    new_y = current_grid_y * PATH_SIZE
-            if y != new_y:
-                if new_y // PATH_SIZE != current_grid_y:
-                    self.traces.append([current_grid_x, current_grid_y, VERTICAL])
-                labyrinth_map.pset(x // TILE_SIZE + 1, y // TILE_SIZE + 1, (9, 0))
-                labyrinth_map.pset(x // TILE_SIZE, y // TILE_SIZE + 1, (8, 0))
-                y = new_y
-                direction = DOWN
-
-        elif pyxel.btn(self.key_up):
-            new_y = y - SPEED
-            if new_y < 0:
-                new_y = 0
-            else:
-                next_row_idx = new_y // PATH_SIZE
-                if (labyrinth_array[current_grid_x, next_row_idx] or 
-                    labyrinth_array[(x + PATH_SIZE - 1) // PATH_SIZE, next_row_idx]):
-                    new_y = (next_row_idx + 1) * PATH_SIZE
-            if y != new_y:
-                if new_y // PATH_SIZE != current_grid_y:
-                    self.traces.append([current_grid_x, current_grid_y, VERTICAL])
-                labyrinth_map.pset(x // TILE_SIZE + 1, new_y // TILE_SIZE + 1, (9, 0))
-                labyrinth_map.pset(x // TILE_SIZE, new_y // TILE_SIZE + 1, (8, 0))
-                y = new_y
-                direction = UP
-
-        self.x = x
-        self.y = y
-
-        if direction is None:
-            self.moving = False
-        else:
-            self.moving = True
-            self.direction = direction
-            
-            current_grid_pos = (self.x // PATH_SIZE, self.y // PATH_SIZE)
-            if current_grid_pos != self.last_sound_position:
-                self.play_footstep_sound()
-                self.last_sound_position = current_grid_pos
-
-    def play_footstep_sound(self):
-        current_game_time = (time.perf_counter_ns() - self.app_instance.game_start_time_ns) / 1_000_000_000
-        
-        footstep_sound_object = self.app_instance.preloaded_footsteps[self.footstep_index % len(self.app_instance.preloaded_footsteps)]
-        
-        panoramique = self.x / SCREEN_WIDTH
-        
-        sound_event = SoundEvent(current_game_time, footstep_sound_object, 0.08, panoramique, character_id=self.character_id) 
-        self.app_instance.audio_queue.put(sound_event)
-        self.footstep_index += 1
+            keys |= MOVE_DOWN
+        return keys
 
     def draw(self):
         if self.exited:
@@ -264,131 +159,48 @@ class Character:
             )
 
 
-class Labyrinth:
-    def __init__(self, width, height):
+class Labyrinth(LabyrinthModel):
+    def __init__(self, width, height, seed=None, algorithm=None, store=None, build_map=True):
         self.offset_x = (SCREEN_WIDTH - LABYRINTH_WIDTH * PATH_SIZE) // 2
         self.offset_y = (SCREEN_HEIGHT - LABYRINTH_HEIGHT * PATH_SIZE) // 2
-        self.generate_array(width, height)
-        self.draw_map()
-
-    def generate_array(self, width, height):
-        self.labyrinth_array = labyrinth_array = numpy.ones((width, height), dtype=bool)
-
-        labyrinth_array[LABYRINTH_START_POSITION[0], LABYRINTH_START_POSITION[1]] = (
-            False
-        )
-
-        def carve(x, y):
-            labyrinth_array[x, y] = False
-            dirs = [(0, 1), (1, 0), (0, -1), (-1, 0)]
-            random.shuffle(dirs)
-            for dx, dy in dirs:
-                jump_x, jump_y = x + dx * 2, y + dy * 2
-
-                if (
-                    0 < jump_x < LABYRINTH_WIDTH - 1
-                    and 0 < jump_y < LABYRINTH_HEIGHT - 1
-                    and labyrinth_array[jump_x][jump_y]
-                ):
-                    labyrinth_array[x + dx, y + dy] = False
-                    carve(jump_x, jump_y)
-
-        carve(LABYRINTH_START_POSITION[0] + 1, LABYRINTH_START_POSITION[1])
-        labyrinth_array[LABYRINTH_END_POSITION[0], LABYRINTH_END_POSITION[1]] = False
-
-    def draw_map(self):
-        self.map = pyxel.Tilemap(MAP_WIDTH, MAP_HEIGHT, pyxel.images[0])
-        labyrinth_array = self.labyrinth_array
-        for x in range(MAP_WIDTH):
-            for y in range(MAP_HEIGHT):
-                labyrinth_x = x // 2
-                labyrinth_y = y // 2
-
-                if labyrinth_array[labyrinth_x, labyrinth_y]:
-
-                    up_y = (y - 1) // 2
-                    down_y = (y + 1) // 2
-                    left_x = (x - 1) // 2
-                    right_x = (x + 1) // 2
-
-                    if up_y >= 0:
-                        labyrinth_up = bool(labyrinth_array[labyrinth_x, up_y])
-                    else:
-                        labyrinth_up = False
-                    if down_y < LABYRINTH_HEIGHT:
-                        labyrinth_down = bool(labyrinth_array[labyrinth_x, down_y])
-                    else:
-                        labyrinth_down = False
-
-                    if left_x >= 0:
-                        labyrinth_left = bool(labyrinth_array[left_x, labyrinth_y])
-                    else:
-                        labyrinth_left = False
-
-                    if right_x < LABYRINTH_WIDTH:
-                        labyrinth_right = bool(labyrinth_array[right_x, labyrinth_y])
-                    else:
-                        labyrinth_right = False
-
-                    match labyrinth_up, labyrinth_left, labyrinth_down, labyrinth_right:
-
-                        case (False, False, False, False):
-                            pass
-                            self.map.pset(x, y, (3, 0))
-
-                        case (False, False, False, True):
-                            self.map.pset(x, y, (3, 0))
-
-                        case (False, False, True, False):
-                            self.map.pset(x, y, (3, 0))
-
-                        case (False, False, True, True):
-                            self.map.pset(x, y, (2, 0))
-
-                        case (False, True, False, False):
-                            self.map.pset(x, y, (3, 0))
-
-                        case (False, True, False, True):
-                            self.map.pset(x, y, (2, 0))
-
-                        case (False, True, True, False):
-                            self.map.pset(x, y, (3, 0))
-
-                        case (False, True, True, True):
-                            self.map.pset(x, y, (5, 0))
-
-                        case (True, False, False, False):
-                            self.map.pset(x, y, (3, 0))
-
-                        case (True, False, True, False):
-                            self.map.pset(x, y, (3, 0))
-
-                        case (True, False, False, True):
-                            self.map.pset(x, y, (2, 1))
-
-                        case (True, False, True, True):
-                            self.map.pset(x, y, (4, 0))
-
-                        case (True, True, False, False):
-                            self.map.pset(x, y, (3, 1))
-
-                        case (True, True, False, True):
-                            self.map.pset(x, y, (4, 1))
-
-                        case (True, True, True, False):
-                            self.map.pset(x, y, (5, 1))
-
-                        case (True, True, True, True):
-                            if not labyrinth_array[left_x, up_y]:
-                                self.map.pset(x, y, (6, 0))
-                            elif not labyrinth_array[right_x, up_y]:
-                                self.map.pset(x, y, (7, 0))
-                            elif not labyrinth_array[left_x, down_y]:
-                                self.map.pset(x, y, (6, 1))
-                            elif not labyrinth_array[right_x, down_y]:
-                                self.map.pset(x, y, (7, 1))
-                        case _:
-                            pass
+        # Un labyrinthe présent dans le magasin est lu avec ses tuiles, sinon il est généré.
+        # Sans algorithme imposé, default_algorithm choisit selon la taille, comme dans LabyrinthModel.
+        if algorithm is None:
+            algorithm = default_algorithm(width, height)
+        index = None
+        if store is not None and seed is not None and (store.width, store.height, store.algorithm) == (width, height, algorithm):
+            index = store.index_of(seed)
+        if index is None:
+            super().__init__(width, height, seed, algorithm)
+            self.tiles = self.build_tiles(self.open_mask)
+        else:
+            self.load_array(store.maze_array(index), seed, algorithm)
+            self.tiles = store.tiles(index)
+        # Sans build_map (chargement en arrière-plan), la tilemap pyxel est construite plus tard par draw_map(self.tiles)
+        # sur le thread principal : les objets pyxel ne quittent pas ce thread.
+        if build_map:
+            self.draw_map(self.tiles)
+
+    def draw_map(self, tiles=None):
+        if tiles is None:
+            tiles = self.build_tiles(self.open_mask)
+        # Tuiles d'origine gardées pour effacer les empreintes.
+        self.tiles = tiles
+        self.map, self.map_data = build_tilemap(tiles)
+        self.trail = FootprintTrail()
+
+    def apply_footprints(self, footprints, tick):
+        # Pose en bloc les empreintes (n, 4) (x, y, u, v) du tick et efface celles qui ont fait leur temps.
+        cleared = self.trail.update(footprints, tick)
+        self.map_data[cleared[:, 1], cleared[:, 0]] = self.tiles[cleared[:, 0], cleared[:, 1]]
+        self.map_data[footprints[:, 1], footprints[:, 0]] = footprints[:, 2:]
+
+    def follow(self, x, y):
+        # Le labyrinthe tient dans l'écran : pas de caméra.
+        pass
+
+    def screen_pan(self, panoramique):
+        return panoramique
 
     def draw(self):
         pyxel.bltm(
@@ -401,48 +213,177 @@ class Labyrinth:
             SCREEN_HEIGHT,
         )
 
+class StreamingLabyrinth(ChunkedLabyrinthModel):
+    # Labyrinthe plus grand que l'écran, généré par morceaux : une tilemap par morceau, construite quand le morceau
+    # entre dans la vue et libérée quand il s'en éloigne. offset_x et offset_y suivent la caméra, les personnages
+    # se dessinent donc comme sur un Labyrinth. Les empreintes d'un morceau libéré sont perdues avec sa tilemap.
+    def __init__(self, width, height, seed=None):
+        super().__init__(width, height, seed)
+        self.maps = {} # (x, y) du morceau -> (pyxel.Tilemap, mémoire de la tilemap, tuiles d'origine)
+        self.trail = FootprintTrail()
+        self.visible = []
+        self.offset_x = 0
+        self.offset_y = 0
+        start_x, start_y = self.start_position
+        self.follow(start_x * PATH_SIZE, start_y * PATH_SIZE)
+
+    def follow(self, x, y):
+        # Centre la caméra sur le point (x, y) en pixels du labyrinthe, sans sortir du labyrinthe.
+        camera_x = min(max(0, x + PATH_SIZE // 2 - SCREEN_WIDTH // 2), max(0, self.width * PATH_SIZE - SCREEN_WIDTH))
+        camera_y = min(max(0, y + PATH_SIZE // 2 - SCREEN_HEIGHT // 2), max(0, self.height * PATH_SIZE - SCREEN_HEIGHT))
+        self.offset_x = -camera_x
+        self.offset_y = -camera_y
+
+        first_x, first_y = self.chunk_of(camera_x // PATH_SIZE, camera_y // PATH_SIZE)
+        last_x, last_y = self.chunk_of((camera_x + SCREEN_WIDTH - 1) // PATH_SIZE, (camera_y + SCREEN_HEIGHT - 1) // PATH_SIZE)
+        self.visible = [(chunk_x, chunk_y) for chunk_x in range(first_x, last_x + 1) for chunk_y in range(first_y, last_y + 1)]
+        for chunk in self.visible:
+            if chunk not in self.maps:
+                tiles = self.chunk_tiles(*chunk)
+                self.maps[chunk] = (*build_tilemap(tiles), tiles)
+                # Les empreintes encore fraîches d'un morceau reconstruit sont reposées.
+                self.write_tiles(self.trail.live(), chunk)
+        # Un morceau voisin de la vue est gardé : la caméra qui oscille sur un bord ne reconstruit rien.
+        for chunk_x, chunk_y in list(self.maps):
+            if not (first_x - 1 <= chunk_x <= last_x + 1 and first_y - 1 <= chunk_y <= last_y + 1):
+                del self.maps[chunk_x, chunk_y]
+
+    def apply_footprints(self, footprints, tick):
+        cleared = self.trail.update(footprints, tick)
+        self.write_tiles(cleared)
+        self.write_tiles(footprints)
+
+    def write_tiles(self, rows, only_chunk=None):
+        # Écrit en bloc des tuiles (x, y, u, v), ou rend les tuiles d'origine pour des lignes (x, y),
+        # dans les morceaux chargés (seulement only_chunk s'il est donné).
+        if not len(rows):
+            return
+        scale = LABYRINTH_TO_MAP_SCALE
+        chunk_x, chunk_y = self.chunk_of(rows[:, 0] // scale, rows[:, 1] // scale)
+        for chunk in set(zip(chunk_x.tolist(), chunk_y.tolist())) if only_chunk is None else (only_chunk,):
+            if chunk not in self.maps:
+                continue
+            _, map_data, tiles = self.maps[chunk]
+            selected = rows[(chunk_x == chunk[0]) & (chunk_y == chunk[1])]
+            x = selected[:, 0] - chunk[0] * self.chunk_size * scale
+            y = selected[:, 1] - chunk[1] * self.chunk_size * scale
+            map_data[y, x] = selected[:, 2:] if selected.shape[1] == 4 else tiles[x, y]
+
+    def screen_pan(self, panoramique):
+        # Panoramique relatif à l'écran et non plus au labyrinthe.
+        return min(1.0, max(0.0, panoramique + self.offset_x / SCREEN_WIDTH))
+
+    def draw(self):
+        for chunk_x, chunk_y in self.visible:
+            x, y, width, height = self.chunk_bounds(chunk_x, chunk_y)
+            pyxel.bltm(
+                x * PATH_SIZE + self.offset_x,
+                y * PATH_SIZE + self.offset_y,
+                self.maps[chunk_x, chunk_y][0],
+                0,
+                0,
+                width * PATH_SIZE,
+                height * PATH_SIZE,
+            )
+
+
+def build_tilemap(tiles):
+    map_width, map_height = tiles.shape[:2]
+    tilemap = pyxel.Tilemap(map_width, map_height, pyxel.images[0])
+    # Écriture en bloc dans la mémoire de la tilemap, rangée en (y, x, coordonnées de tuile).
+    map_data = numpy.ctypeslib.as_array(tilemap.data_ptr()).reshape(map_height, map_width, 2)
+    map_data[:] = tiles.transpose(1, 0, 2)
+    return tilemap, map_data
+
+
 class App:
-    def __init__(self):
-        pyxel.init(SCREEN_WIDTH, SCREEN_HEIGHT, title="Shining", fps=30)
-        pyxel.load(RESOURCE_PATH)
-        
-        self.audio_queue = queue.Queue()
-        self.audio_player = AudioPlayer(self.audio_queue)
-        self.audio_player.start()
-        
-        self.game_start_time_ns = time.perf_counter_ns()
-        self.game_running = True
-        self.game_won = False
-        self.game_over_timeout = 120 
-
-        self.footsteps = [
-            "sounds/snow_step_1.wav", 
-            "sounds/snow_step_2.wav", 
-            "sounds/snow_step_3.wav",
-            "sounds/snow_step_4.wav",
-            "sounds/snow_step_5.wav",
-            "sounds/snow_step_6.wav",
-            "sounds/snow_step_7.wav"
-        ]
-        
-        # Précharge tous les sons de pas au démarrage du jeu pour éviter la latence.
-        self.preloaded_footsteps = []
-        for path in self.footsteps:
-            try:
-                self.preloaded_footsteps.append(pygame.mixer.Sound(path))
-            except pygame.error:
-                print(f"Erreur lors du chargement du son de pas : {path}")
-                self.preloaded_footsteps.append(None)
-
-        self.victory_sound_path = "sounds/victory_by_xtrgamr.wav"
-        self.game_over_sound_path = "sounds/game_over_by_Leszek_Szary.wav"
-        self.ambient_sound_path = "sounds/Wendy Carlos - Main Title (The Shining).flac"
-        
-        self.audio_player.start_ambient(self.ambient_sound_path, 0.3)
-        
-        self.labyrinth = Labyrinth(LABYRINTH_WIDTH, LABYRINTH_HEIGHT)
+    def __init__(self, seed=None, record_path=None, replay_path=None, show_audio_stats=False, profile_path=None, father_ai=False, maze_store=None, stream_size=None):
+        # Seuls pyxel et ses ressources sont chargés avant la première image : sons et labyrinthe se chargent sur
+        # un thread pendant que l'écran de chargement s'affiche, puis finish_loading lance la partie.
+        self.startup = StartupTimer(STARTUP_ORIGIN_NS)
+        with self.startup.phase("pyxel.init"):
+            # Échap est traité comme L par quit, pour que journal et trace soient écrits avant de quitter.
+            pyxel.init(SCREEN_WIDTH, SCREEN_HEIGHT, title="Shining", fps=FPS, quit_key=pyxel.KEY_NONE)
+        with self.startup.phase("ressources"):
+            pyxel.load(RESOURCE_PATH)
+
+        self.show_audio_stats = show_audio_stats
+        # Profilage des images, actif d'emblée si un export est demandé, sinon basculé avec F2.
+        self.profile_path = profile_path
+        self.profiler = FrameProfiler(enabled=profile_path is not None)
+        self.game_over_timeout = GAME_OVER_TIMEOUT
+
+        self.footsteps = FOOTSTEP_SOUND_PATHS
+        self.victory_sound_path = VICTORY_SOUND_PATH
+        self.game_over_sound_path = GAME_OVER_SOUND_PATH
+        self.ambient_sound_path = AMBIENT_SOUND_PATH
+
+        # Enregistrement et rejeu avancent le temps de jeu d'une image par tick pour rester déterministes.
+        self.replay_frames = None
+        self.recorder = None
+        self.record_path = record_path
+        self.father_ai = father_ai
+        self.fixed_time_step = record_path is not None or replay_path is not None
+        width, height = LABYRINTH_WIDTH, LABYRINTH_HEIGHT
+        algorithm = default_algorithm(width, height)
+        if replay_path is not None:
+            replay_log = InputLog.load(replay_path)
+            seed, width, height, algorithm = replay_log.seed, replay_log.width, replay_log.height, replay_log.algorithm
+            self.father_ai = replay_log.father_ai
+            self.replay_frames = iter(replay_log)
+        elif stream_size is not None:
+            (width, height), algorithm = stream_size, "chunked"
+        elif maze_store is not None and len(maze_store) and (maze_store.width, maze_store.height) == (width, height):
+            # Le labyrinthe est généré comme ceux du magasin, pour qu'une graine présente y soit lue.
+            algorithm = maze_store.algorithm
+            index = maze_store.random_index() if seed is None else None
+            if index is not None:
+                seed = int(maze_store.seeds[index])
+        elif maze_store is not None:
+            print(f"Magasin de labyrinthes ignoré : {maze_store.width}x{maze_store.height}, la partie est en {width}x{height}")
+        if record_path is not None and seed is None:
+            seed = random.randrange(2 ** 32)
+        self.seed, self.width, self.height, self.algorithm = seed, width, height, algorithm
+
+        self.loaded = False
+        self.load_error = None
+        self.labyrinth = None
+        self.loader = threading.Thread(target=self.load_assets, args=(maze_store,), name="chargement", daemon=True)
+        self.loader.start()
+        pyxel.run(self.update, self.draw)
+
+    def load_assets(self, maze_store):
+        # Thread de chargement : import de pygame et ouverture du mixer, décodage des sons, génération du labyrinthe.
+        try:
+            with self.startup.phase("sons"):
+                self.sound_cache = SoundCache()
+                # Précharge tous les sons déclarés pour éviter la latence de décodage à la lecture.
+                # Les SoundEvent de la simulation désignent les sons par leur chemin, résolu par ce cache.
+                self.failed_sounds = list(self.sound_cache.preload(self.footsteps + [self.victory_sound_path, self.game_over_sound_path, CAUGHT_SOUND_PATH]))
+            # Un labyrinthe par morceaux ne génère ses morceaux qu'à l'entrée dans la vue, sur le thread principal.
+            if self.algorithm != "chunked":
+                with self.startup.phase("labyrinthe"):
+                    self.labyrinth = Labyrinth(self.width, self.height, self.seed, self.algorithm, store=maze_store, build_map=False)
+        except Exception as error:
+            self.load_error = error
+
+    def finish_loading(self):
+        # Sur le thread principal, une fois load_assets terminé : tilemaps, personnages, simulation et thread audio.
+        if self.load_error is not None:
+            raise self.load_error
+        for path in self.failed_sounds:
+            print(f"Erreur lors du chargement du son : {path}")
+
+        with self.startup.phase("carte"):
+            # Un labyrinthe par morceaux défile sous une caméra qui suit le fils.
+            if self.labyrinth is None:
+                self.labyrinth = StreamingLabyrinth(self.width, self.height, self.seed)
+            else:
+                self.labyrinth.draw_map(self.labyrinth.tiles)
+        if self.record_path is not None:
+            self.recorder = InputRecorder(self.record_path, self.seed, self.width, self.height, algorithm=self.algorithm, father_ai=self.father_ai)
         self.son = Character(
-            LABYRINTH_START_POSITION,
+            self.labyrinth.start_position,
             key_right=pyxel.KEY_RIGHT,
             key_left=pyxel.KEY_LEFT,
             key_up=pyxel.KEY_UP,
@@ -453,7 +394,7 @@ class App:
             image_index=1,
         )
         self.father = Character(
-            LABYRINTH_START_POSITION,
+            self.labyrinth.start_position,
             key_right=pyxel.KEY_D, 
             key_left=pyxel.KEY_Q,  
             key_up=pyxel.KEY_Z,    
@@ -464,50 +405,134 @@ class App:
             image_index=2,
             transparent_color=2,
         )
-        pyxel.run(self.update, self.draw)
+        self.simulation = Simulation(self.labyrinth, [self.son, self.father], self.game_over_timeout)
+        # Avec father_ai, le père suit le fils tout seul et un son de capture joue quand il l'atteint.
+        # Un journal rejoué contient déjà les entrées calculées par le pilote automatique : seul le son est rebranché.
+        if self.father_ai:
+            self.simulation.pursuit = Pursuit(self.labyrinth, target=0, pursuers=(1,), autopilot=self.replay_frames is None)
+        if self.profiler.enabled:
+            self.simulation.profiler = self.profiler
+
+        # Le temps de jeu part de la fin du chargement, pas du lancement du programme.
+        self.audio_queue = SoundScheduler()
+        self.game_start_time_ns = time.perf_counter_ns()
+        # Même origine de temps que le jeu, pour que la télémétrie mesure le vrai décalage image/son.
+        # En pas fixe, les sons sont datés en ticks / FPS : le lecteur suit alors le temps de jeu, sans quoi
+        # une image en retard creuserait l'écart avec l'horloge murale et max_lateness abandonnerait tous les pas.
+        clock = (lambda: self.simulation.game_time) if self.fixed_time_step else None
+        self.audio_player = AudioPlayer(self.audio_queue, self.sound_cache, self.game_start_time_ns, clock=clock)
+        self.audio_player.start()
+        self.audio_player.start_ambient(self.ambient_sound_path, AMBIENT_VOLUME)
+        self.loaded = True
+        self.startup.mark("partie prête")
+        print(self.startup.report())
 
     def update(self):
-        if pyxel.btnp(pyxel.KEY_L):
-            self.game_running = False 
-            self.audio_player.stop_ambient()
-            pyxel.quit()
+        if pyxel.btnp(pyxel.KEY_L) or pyxel.btnp(pyxel.KEY_ESCAPE):
+            self.quit()
             return
-
-        if not self.game_running:
+        if not self.loaded:
+            if self.loader.is_alive():
+                return
+            self.finish_loading()
+        with self.profiler.span("update"):
+            self.update_game()
+
+    def update_game(self):
+        simulation = self.simulation
+        if pyxel.btnp(pyxel.KEY_F1):
+            self.show_audio_stats = not self.show_audio_stats
+        if pyxel.btnp(pyxel.KEY_F2):
+            self.toggle_profiler()
+
+        if not simulation.game_running:
+            self.stop_recording()
             if self.audio_player.is_ambient_playing():
                 self.audio_player.stop_ambient()
             return 
-        
-        self.son.update()
-        self.father.update()
-
-        current_game_time = (time.perf_counter_ns() - self.game_start_time_ns) / 1_000_000_000
-        self.remaining_time = max(0, int(self.game_over_timeout - current_game_time))
-
-        if self.son.exited and self.father.exited and not self.game_won:
-            sound_event = SoundEvent(current_game_time, self.victory_sound_path, 1.0, 0.5)
-            self.audio_queue.put(sound_event)
-            self.game_won = True
-            self.game_running = False 
-
-        if current_game_time > self.game_over_timeout and not self.son.exited and not self.father.exited and not self.game_won:
-            sound_event = SoundEvent(current_game_time, self.game_over_sound_path, 1.0, 0.5)
-            self.audio_queue.put(sound_event)
-            self.game_running = False
+
+        if self.replay_frames is not None:
+            inputs = next(self.replay_frames, None)
+            if inputs is None:
+                return
+        else:
+            inputs = [character.read_keys() for character in simulation.characters]
+
+        current_game_time = None
+        if not self.fixed_time_step:
+            current_game_time = (time.perf_counter_ns() - self.game_start_time_ns) / 1_000_000_000
+        sound_cues = simulation.tick(inputs, current_game_time)
+        # La caméra suit le fils avant la pose des empreintes, pour que leurs morceaux soient construits.
+        self.labyrinth.follow(self.son.x, self.son.y)
+        screen_pan = self.labyrinth.screen_pan
+        self.audio_queue.put_many([
+            SoundEvent(game_time, path, volume, screen_pan(panoramique), character_id, priority)
+            for game_time, path, volume, panoramique, character_id, priority in sound_cues
+        ])
+        if self.recorder is not None:
+            self.recorder.write(simulation.inputs)
+        with self.profiler.span("footprints"):
+            footprints = [(x, y, u, v) for character in simulation.characters for x, y, (u, v) in character.footprints]
+            self.labyrinth.apply_footprints(numpy.array(footprints, dtype=numpy.int64).reshape(-1, 4), simulation.ticks)
+
+        if simulation.game_over:
             self.audio_player.stop_ambient()
 
-    def draw(self):
-        pyxel.cls(7)
-        self.labyrinth.draw()
-        self.son.draw()
-        self.father.draw()
+    def quit(self):
+        # Sortie commune à L et Échap, chargement terminé ou non. pyxel.quit ne rend pas la main : tout est écrit avant.
+        # La fermeture de la fenêtre ne passe par aucun rappel ; le journal, vidé chaque seconde, en perd au plus une.
+        if self.loaded:
+            self.simulation.game_running = False
+            self.audio_player.stop_ambient()
+        self.stop_recording()
+        self.export_profile()
+        pyxel.quit()
+
+    def stop_recording(self):
+        if self.recorder is not None:
+            self.recorder.close()
 
-        pyxel.text(5, 5, f"Time: {self.remaining_time}s", 0)
+    def toggle_profiler(self):
+        self.profiler.enabled = not self.profiler.enabled
+        self.simulation.profiler = self.profiler if self.profiler.enabled else None
 
-        if not self.game_running and not self.game_won:
+    def export_profile(self):
+        if self.profile_path is not None:
+            self.profiler.export_chrome_trace(self.profile_path)
+
+    def draw(self):
+        if not self.loaded:
+            self.draw_loading()
+            return
+        profiler = self.profiler
+        with profiler.span("draw"):
+            pyxel.cls(7)
+            with profiler.span("labyrinth.draw"):
+                self.labyrinth.draw()
+            with profiler.span("son.draw"):
+                self.son.draw()
+            with profiler.span("father.draw"):
+                self.father.draw()
+            self.draw_hud()
+        profiler.end_frame()
+
+    def draw_loading(self):
+        pyxel.cls(7)
+        pyxel.text(SCREEN_WIDTH // 2 - 26, SCREEN_HEIGHT // 2 - 3, "Chargement...", 0)
+        self.startup.mark("première image")
+
+    def draw_hud(self):
+        simulation = self.simulation
+        pyxel.text(5, 5, f"Time: {simulation.remaining_time}s", 0)
+        if self.show_audio_stats:
+            self.draw_audio_stats()
+        if self.profiler.enabled:
+            self.draw_profiler_stats()
+
+        if not simulation.game_running and not simulation.game_won:
             message = "GAME OVER!"
             text_color = pyxel.COLOR_RED
-        elif self.game_won:
+        elif simulation.game_won:
             message = "VICTORY!"
             text_color = pyxel.COLOR_GREEN
         else:
@@ -530,5 +555,46 @@ class App:
             pyxel.rect(rect_x, rect_y, rect_width, rect_height, pyxel.COLOR_BLACK)
             pyxel.text(text_x, text_y, message, text_color)
 
+    def draw_audio_stats(self):
+        # Surimpression (F1) des retards de lecture mesurés par le thread audio.
+        stats = self.audio_player.telemetry.snapshot()
+        lines = [f"audio events {stats['events']} steals {stats['voice_steals']} rejected {stats['voice_rejections']}"]
+        if "lateness_p50_s" in stats:
+            lines.append(
+                f"late p50 {stats['lateness_p50_s'] * 1000:.1f}ms p99 {stats['lateness_p99_s'] * 1000:.1f}ms "
+                f"max {stats['lateness_max_s'] * 1000:.1f}ms"
+            )
+            lines.append(f"jitter {stats['jitter_s'] * 1000:.1f}ms queue max {stats['queue_depth_max']}")
+        lines.append(f"coalesced {self.audio_queue.coalesced} dropped late {stats['late_drops']}")
+        for index, line in enumerate(lines):
+            pyxel.text(SCREEN_WIDTH - len(line) * 4 - 5, 5 + index * 8, line, 0)
+
+    def draw_profiler_stats(self):
+        # Surimpression (F2) des temps de mise à jour et d'affichage sur la fenêtre glissante.
+        stats = self.profiler.stats()
+        lines = []
+        for name in ("update", "draw"):
+            if name in stats:
+                lines.append(f"{name} p50 {stats[name]['p50_s'] * 1000:.2f}ms p99 {stats[name]['p99_s'] * 1000:.2f}ms")
+        for index, line in enumerate(lines):
+            pyxel.text(5, SCREEN_HEIGHT - 8 * (len(lines) - index) - 3, line, 0)
+
 if __name__ == "__main__":
-    game_app = App()
+    parser = argparse.ArgumentParser(description="Shining")
+    parser.add_argument("--seed", type=int, help="graine du labyrinthe")
+    parser.add_argument("--record", metavar="JOURNAL", help="enregistre les entrées de la partie dans ce fichier")
+    parser.add_argument("--replay", metavar="JOURNAL", help="rejoue en temps réel un journal enregistré avec --record")
+    parser.add_argument("--audio-stats", action="store_true", help="affiche les retards audio (bascule avec F1)")
+    parser.add_argument("--profile", metavar="TRACE", help="profile chaque image et exporte une trace Chrome en quittant (L)")
+    parser.add_argument("--father-ai", action="store_true", help="le père poursuit le fils tout seul")
+    parser.add_argument("--stream", metavar="LARGEURxHAUTEUR", help="labyrinthe plus grand que l'écran, généré par morceaux sous une caméra")
+    parser.add_argument("--maze-store", metavar="MAGASIN", help="lit les labyrinthes dans un magasin construit par labyrinth_store.py")
+    args = parser.parse_args()
+    stream_size = None
+    if args.stream:
+        stream_size = tuple(int(side) | 1 for side in args.stream.lower().split("x"))
+        if args.father_ai:
+            # Les champs de distance du pilote automatique couvrent tout le labyrinthe.
+            parser.error("--father-ai n'est pas disponible avec --stream")
+    game_app = App(args.seed, args.record, args.replay, args.audio_stats, args.profile, args.father_ai,
+                   MazeStore(args.maze_store) if args.maze_store else None, stream_size)
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Banc de mesure des chemins critiques : génération du labyrinthe, construction de la tilemap,
+tick de la simulation et distribution des événements audio, pour plusieurs tailles de labyrinthe.
+
+Les résultats sont écrits en JSON pour comparer les exécutions entre elles :
+
+    python benchmarks.py --sizes 39x27 399x399 1999x1999 --output bench.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import threading
+import time
+
+import numpy
+
+from labyrinth_core import FOOTSTEP_SOUND_PATHS, LabyrinthModel, Simulation, SwarmSimulation
+
+BASE_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_SIZES = ("39x27", "199x199", "999x999", "1999x1999")
+
+
+def measure(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return {
+        "rounds": repeat,
+        "min_s": min(timings),
+        "mean_s": statistics.fmean(timings),
+        "median_s": statistics.median(timings),
+        "max_s": max(timings),
+    }
+
+
+def percentiles(values, quantiles=(50, 90, 99)):
+    if not len(values):
+        return {}
+    return {f"p{quantile}_s": float(numpy.percentile(values, quantile)) for quantile in quantiles}
+
+
+def bench_generation(width, height, repeat):
+    results = []
+    for algorithm in ("backtracker", "kruskal"):
+        labyrinth = LabyrinthModel.__new__(LabyrinthModel)
+        seeds = iter(range(repeat))
+        timing = measure(lambda: labyrinth.generate_array(width, height, next(seeds), algorithm), repeat)
+        results.append({"name": "generate_array", "params": {"width": width, "height": height, "algorithm": algorithm}, **timing})
+    return results
+
+
+def bench_tiles(width, height, repeat):
+    labyrinth = LabyrinthModel(width, height, seed=0, algorithm="kruskal")
+    results = [{
+        "name": "build_tiles",
+        "params": {"width": width, "height": height},
+        **measure(lambda: labyrinth.build_tiles(labyrinth.open_mask), repeat),
+    }]
+
+    # La tilemap pyxel complète n'est mesurée que si le module d'affichage est importable ici.
+    try:
+        from baptiste_delagorce import Labyrinth
+    except Exception as error:
+        print(f"draw_map ignoré : {error}", file=sys.stderr)
+        return results
+
+    labyrinth = Labyrinth(width, height, seed=0, algorithm="kruskal")
+    results.append({"name": "draw_map", "params": {"width": width, "height": height}, **measure(labyrinth.draw_map, repeat)})
+    return results
+
+
+def bench_ticks(width, height, ticks, repeat):
+    # Entrées aléatoires mais fixes ; la fin de partie est repoussée pour que chaque tick fasse bouger les personnages.
+    inputs = numpy.random.default_rng(0).integers(0, 16, size=(ticks, 2)).tolist()
+
+    elapsed = []
+    for _ in range(repeat):
+        simulation = Simulation.create(0, width, height, algorithm="kruskal", game_over_timeout=10 ** 9)
+        tick = simulation.tick
+        start = time.perf_counter()
+        for frame in inputs:
+            tick(frame)
+        elapsed.append(time.perf_counter() - start)
+    per_tick = [duration / ticks for duration in elapsed]
+    return [{
+        "name": "simulation_tick",
+        "params": {"width": width, "height": height, "ticks": ticks, "characters": 2},
+        "rounds": repeat,
+        "min_s": min(per_tick),
+        "mean_s": statistics.fmean(per_tick),
+        "median_s": statistics.median(per_tick),
+        "max_s": max(per_tick),
+        "ticks_per_s": ticks / min(elapsed),
+    }]
+
+
+def bench_swarm(width, height, ticks, character_count, repeat):
+    # Pas vectorisé de SwarmSimulation pour de nombreux personnages aux entrées aléatoires.
+    inputs = numpy.random.default_rng(0).integers(0, 16, size=(ticks, character_count))
+    character_ids = [f"character_{index}" for index in range(character_count)]
+
+    elapsed = []
+    for _ in range(repeat):
+        simulation = SwarmSimulation.create(0, width, height, character_ids, algorithm="kruskal", game_over_timeout=10 ** 9)
+        tick = simulation.tick
+        start = time.perf_counter()
+        for frame in inputs:
+            tick(frame)
+        elapsed.append(time.perf_counter() - start)
+    return [{
+        "name": "swarm_tick",
+        "params": {"width": width, "height": height, "ticks": ticks, "characters": character_count},
+        "rounds": repeat,
+        "min_s": min(elapsed) / ticks,
+        "median_s": statistics.median(elapsed) / ticks,
+        "character_steps_per_s": ticks * character_count / min(elapsed),
+    }]
+
+
+def bench_audio(event_count, spacing, timeout=30.0):
+    # Mesure sur un vrai AudioPlayer (pilote audio factice si aucun n'est imposé) :
+    # retard de lecture par rapport au timestamp pour des événements espacés, puis débit sur une rafale.
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    os.chdir(BASE_DIRECTORY)
+    from audio_manager import AudioPlayer, SoundEvent, SoundScheduler
+
+    # Ni regroupement par personnage ni abandon des retards : chaque événement est joué et mesuré.
+    scheduler = SoundScheduler(coalesce=False)
+    player = AudioPlayer(scheduler, max_lateness=None)
+    sound = player.sound_cache.get(FOOTSTEP_SOUND_PATHS[0])
+    lateness = []
+    done = threading.Event()
+    expected = [0]
+    play_event = player.play_event
+
+    def timed_play_event(sound_event):
+        lateness.append(player.sequence_time() - sound_event.timestamp)
+        play_event(sound_event)
+        if len(lateness) >= expected[0]:
+            done.set()
+
+    player.play_event = timed_play_event
+    player.start()
+
+    results = []
+    expected[0] = event_count
+    first = player.sequence_time() + 0.05
+    for index in range(event_count):
+        scheduler.put(SoundEvent(first + index * spacing, sound, 0.08, 0.5, "son"))
+    done.wait(timeout)
+    scheduled = numpy.array(lateness)
+    results.append({
+        "name": "audio_scheduling",
+        "params": {"events": event_count, "spacing_s": spacing},
+        "played": len(scheduled),
+        "mean_late_s": float(scheduled.mean()) if len(scheduled) else None,
+        "max_late_s": float(scheduled.max()) if len(scheduled) else None,
+        **percentiles(scheduled),
+    })
+
+    lateness.clear()
+    done.clear()
+    now = player.sequence_time()
+    start = time.perf_counter()
+    for index in range(event_count):
+        scheduler.put(SoundEvent(now, sound, 0.08, 0.5, "son"))
+    done.wait(timeout)
+    elapsed = time.perf_counter() - start
+    results.append({
+        "name": "audio_dispatch",
+        "params": {"events": event_count},
+        "played": len(lateness),
+        "elapsed_s": elapsed,
+        "events_per_s": len(lateness) / elapsed,
+    })
+
+    player.stop()
+    return results
+
+
+def parse_size(text):
+    width, height = text.lower().split("x")
+    return int(width), int(height)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mesure les chemins critiques du jeu et écrit les résultats en JSON.")
+    parser.add_argument("--sizes", nargs="+", default=DEFAULT_SIZES, help="tailles de labyrinthe LARGEURxHAUTEUR")
+    parser.add_argument("--repeat", type=int, default=5, help="nombre de mesures par cas")
+    parser.add_argument("--ticks", type=int, default=3000, help="ticks simulés par mesure")
+    parser.add_argument("--characters", type=int, default=1000, help="personnages de la mesure vectorisée")
+    parser.add_argument("--audio-events", type=int, default=200, help="événements sonores par mesure audio")
+    parser.add_argument("--only", nargs="+", choices=("generation", "tiles", "ticks", "swarm", "audio"), help="ne lance que ces mesures")
+    parser.add_argument("--output", default="benchmarks.json", help="fichier JSON de sortie")
+    args = parser.parse_args()
+    # Résolu avant les mesures : bench_audio se place dans BASE_DIRECTORY pour trouver les sons et leur PCM précompilé.
+    output_path = os.path.abspath(args.output)
+
+    selected = set(args.only or ("generation", "tiles", "ticks", "swarm", "audio"))
+    results = []
+    for width, height in map(parse_size, args.sizes):
+        if "generation" in selected:
+            results += bench_generation(width, height, args.repeat)
+        if "tiles" in selected:
+            results += bench_tiles(width, height, args.repeat)
+        if "ticks" in selected:
+            results += bench_ticks(width, height, args.ticks, args.repeat)
+        if "swarm" in selected:
+            results += bench_swarm(width, height, args.ticks, args.characters, args.repeat)
+    if "audio" in selected:
+        results += bench_audio(args.audio_events, 0.005)
+
+    for result in results:
+        print(result["name"], result["params"], {key: value for key, value in result.items() if key not in ("name", "params")})
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "numpy": numpy.__version__,
+            "platform": platform.platform(),
+        },
+        "results": results,
+    }
+    with open(output_path, "w") as output_file:
+        json.dump(report, output_file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
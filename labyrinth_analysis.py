@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Résolution et analyse d'un labyrinthe généré : plus court chemin de l'entrée à la sortie, cartes de distances
+et mesures de difficulté (culs-de-sac, embranchements, temps de parcours estimé).
+
+Les analyses sont mises en cache par graine : une fois calculée, une indication (case suivante vers la sortie)
+ou une distance se lit en O(1). Pour choisir des graines jouables dans le temps imparti :
+
+    python labyrinth_analysis.py --seeds 0 200 --min-time 40 --max-time 90
+"""
+
+import argparse
+import collections
+
+import numpy
+
+from labyrinth_core import (
+    ALGORITHMS,
+    FPS,
+    GAME_OVER_TIMEOUT,
+    LABYRINTH_HEIGHT,
+    LABYRINTH_WIDTH,
+    OPEN_CELL,
+    OPEN_DOWN,
+    OPEN_LEFT,
+    OPEN_RIGHT,
+    OPEN_UP,
+    PATH_SIZE,
+    SPEED,
+    DistanceFieldCache,
+    LabyrinthModel,
+    default_algorithm,
+)
+
+# Nombre de directions ouvertes pour chaque valeur du masque (bits OPEN_RIGHT..OPEN_UP).
+OPEN_DEGREE = numpy.array([bin(mask & 15).count("1") for mask in range(OPEN_CELL * 2)], dtype=numpy.uint8)
+NEIGHBORS = ((OPEN_RIGHT, 1, 0), (OPEN_DOWN, 0, 1), (OPEN_LEFT, -1, 0), (OPEN_UP, 0, -1))
+
+
+class LabyrinthAnalysis:
+    # Tout ce qui se déduit du labyrinthe seul, calculé une fois : distances depuis l'entrée et vers la sortie,
+    # chemin solution, degrés des cases et mesures de difficulté.
+    def __init__(self, labyrinth):
+        self.labyrinth = labyrinth
+        self.start = labyrinth.start_position
+        self.end = labyrinth.end_position
+        fields = DistanceFieldCache(labyrinth)
+        self.distance_to_exit = fields.field(self.end)
+        self.distance_from_start = fields.field(self.start)
+        self.path = self.solution_from(self.start)
+        self.on_path = numpy.zeros(self.distance_to_exit.shape, dtype=bool)
+        if self.path:
+            self.on_path[tuple(numpy.array(self.path).T)] = True
+        self.metrics = self.compute_metrics()
+
+    def next_cell(self, cell):
+        # Case voisine qui rapproche de la sortie, ou None sur la sortie ou hors du chemin : l'indication en jeu.
+        x, y = cell
+        distance = self.distance_to_exit[x, y]
+        if distance <= 0:
+            return None
+        mask = self.labyrinth.open_mask[x, y]
+        for bit, step_x, step_y in NEIGHBORS:
+            if mask & bit and self.distance_to_exit[x + step_x, y + step_y] == distance - 1:
+                return (x + step_x, y + step_y)
+        return None
+
+    def solution_from(self, cell):
+        # Plus court chemin de cell à la sortie, cases comprises ; vide si la sortie n'est pas atteignable.
+        if self.distance_to_exit[cell] < 0:
+            return []
+        path = [tuple(cell)]
+        while path[-1] != tuple(self.end):
+            path.append(self.next_cell(path[-1]))
+        return path
+
+    def compute_metrics(self):
+        open_mask = self.labyrinth.open_mask
+        is_path = (open_mask & OPEN_CELL).astype(bool)
+        degree = OPEN_DEGREE[open_mask]
+        reachable = self.distance_from_start >= 0
+        solution_length = len(self.path) - 1
+        # Au passage sur le chemin solution, chaque voie en plus de l'arrivée et du départ est un choix à faire.
+        path_degree = degree[tuple(numpy.array(self.path).T)].astype(numpy.int64) if self.path else numpy.zeros(0, dtype=numpy.int64)
+        decisions = int(numpy.clip(path_degree[1:-1] - 2, 0, None).sum()) if solution_length > 1 else 0
+        branching = degree[is_path & (degree >= 2)].astype(numpy.float64) - 1
+
+        frames_per_cell = PATH_SIZE // SPEED
+        return {
+            "seed": self.labyrinth.seed,
+            "width": self.labyrinth.width,
+            "height": self.labyrinth.height,
+            "algorithm": self.labyrinth.algorithm,
+            "path_cells": int(is_path.sum()),
+            "reachable_cells": int(reachable.sum()),
+            "solution_length": solution_length,
+            "solution_ratio": len(self.path) / max(1, int(reachable.sum())),
+            "dead_ends": int((is_path & (degree == 1)).sum()),
+            "junctions": int((is_path & (degree >= 3)).sum()),
+            "branching_factor": float(branching.mean()) if len(branching) else 0.0,
+            "decisions": decisions,
+            "max_distance": int(self.distance_from_start.max()),
+            # Temps minimal pour qu'un personnage sorte à vitesse constante, sans hésiter.
+            "estimated_time_s": solution_length * frames_per_cell / FPS,
+        }
+
+    def fits_timeout(self, timeout=GAME_OVER_TIMEOUT, margin=1.0):
+        return bool(self.path) and self.metrics["estimated_time_s"] * margin <= timeout
+
+
+_analyses = collections.OrderedDict() # (graine, largeur, hauteur, algorithme) -> LabyrinthAnalysis
+ANALYSIS_CACHE_SIZE = 256
+
+
+def analyse(labyrinth):
+    # Analyse mise en cache pour les labyrinthes à graine fixée ; un labyrinthe sans graine est analysé à chaque fois.
+    if labyrinth.seed is None:
+        return LabyrinthAnalysis(labyrinth)
+    key = (labyrinth.seed, labyrinth.width, labyrinth.height, labyrinth.algorithm)
+    analysis = _analyses.get(key)
+    if analysis is not None:
+        _analyses.move_to_end(key)
+        return analysis
+    analysis = _analyses[key] = LabyrinthAnalysis(labyrinth)
+    if len(_analyses) > ANALYSIS_CACHE_SIZE:
+        _analyses.popitem(last=False)
+    return analysis
+
+
+def analyse_seed(seed, width=LABYRINTH_WIDTH, height=LABYRINTH_HEIGHT, algorithm=None):
+    # Résolu avant la clé : analyse() range le résultat sous le nom du générateur effectivement utilisé.
+    algorithm = algorithm or default_algorithm(width, height)
+    key = (seed, width, height, algorithm)
+    if key in _analyses:
+        _analyses.move_to_end(key)
+        return _analyses[key]
+    return analyse(LabyrinthModel(width, height, seed, algorithm))
+
+
+def select_seeds(seeds, min_time=0.0, max_time=GAME_OVER_TIMEOUT, width=LABYRINTH_WIDTH, height=LABYRINTH_HEIGHT, algorithm=None):
+    # Graines dont le temps de parcours estimé tombe dans [min_time, max_time].
+    selected = []
+    for seed in seeds:
+        metrics = analyse_seed(seed, width, height, algorithm).metrics
+        if min_time <= metrics["estimated_time_s"] <= max_time:
+            selected.append(seed)
+    return selected
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Résout et mesure des labyrinthes sans les jouer.")
+    parser.add_argument("--seeds", nargs=2, type=int, default=(0, 20), metavar=("PREMIÈRE", "NOMBRE"), help="plage de graines")
+    parser.add_argument("--size", default=f"{LABYRINTH_WIDTH}x{LABYRINTH_HEIGHT}", help="taille LARGEURxHAUTEUR")
+    parser.add_argument("--algorithm", choices=ALGORITHMS, help="générateur, par défaut selon la taille (default_algorithm)")
+    parser.add_argument("--min-time", type=float, default=0.0, help="temps de parcours estimé minimal (s)")
+    parser.add_argument("--max-time", type=float, default=GAME_OVER_TIMEOUT, help="temps de parcours estimé maximal (s)")
+    args = parser.parse_args()
+
+    width, height = map(int, args.size.lower().split("x"))
+    first, count = args.seeds
+    columns = ("seed", "solution_length", "estimated_time_s", "dead_ends", "junctions", "decisions", "branching_factor")
+    print(" ".join(f"{column:>16}" for column in columns))
+    for seed in range(first, first + count):
+        metrics = analyse_seed(seed, width, height, args.algorithm).metrics
+        if args.min_time <= metrics["estimated_time_s"] <= args.max_time:
+            print(" ".join(f"{metrics[column]:>16.2f}" if isinstance(metrics[column], float) else f"{metrics[column]:>16}" for column in columns))
+
+
+if __name__ == "__main__":
+    main()
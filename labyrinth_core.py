@@ -0,0 +1,1124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cœur de simulation du labyrinthe, sans pyxel ni pygame.
+
+Le modèle du labyrinthe, les règles de déplacement des personnages et l'état de la partie
+avancent tick par tick à partir d'un vecteur d'entrées ; l'affichage et le son s'y branchent
+par-dessus (baptiste_delagorce.py, audio_manager.py).
+"""
+
+import numpy
+import itertools
+import collections
+
+SCREEN_WIDTH = 640
+SCREEN_HEIGHT = 480
+SPEED = 2
+FPS = 30
+
+TILE_SIZE = 8
+PATH_SIZE = TILE_SIZE * 2
+LABYRINTH_WIDTH = SCREEN_WIDTH // PATH_SIZE
+LABYRINTH_HEIGHT = SCREEN_HEIGHT // PATH_SIZE
+
+if LABYRINTH_WIDTH % 4 != 3:
+    LABYRINTH_WIDTH = LABYRINTH_WIDTH // 4 * 4 - 1
+if LABYRINTH_HEIGHT % 4 != 3:
+    LABYRINTH_HEIGHT = LABYRINTH_HEIGHT // 4 * 4 - 1
+
+LABYRINTH_START_POSITION = (0, LABYRINTH_HEIGHT // 2)
+LABYRINTH_END_POSITION = (LABYRINTH_WIDTH - 1, LABYRINTH_HEIGHT // 2)
+
+LABYRINTH_TO_MAP_SCALE = 2
+MAP_WIDTH = LABYRINTH_WIDTH * LABYRINTH_TO_MAP_SCALE
+MAP_HEIGHT = LABYRINTH_HEIGHT * LABYRINTH_TO_MAP_SCALE
+
+LABYRINTH_TO_SCREEN_SCALE = 16
+
+# Algorithmes de génération, dans l'ordre de leur code dans les journaux et les corpus de labyrinthes.
+ALGORITHMS = ("backtracker", "kruskal", "chunked")
+
+# Côté d'un morceau de ChunkedLabyrinthModel en cases, pair pour que les bords des morceaux tombent sur des murs.
+CHUNK_SIZE = 32
+
+# Masque des directions ouvertes calculé une fois par case (LabyrinthModel.open_mask).
+# Un bit est levé quand la case voisine dans cette direction existe et n'est pas un mur,
+# OPEN_CELL quand la case elle-même est un chemin.
+OPEN_RIGHT = 1
+OPEN_DOWN = 2
+OPEN_LEFT = 4
+OPEN_UP = 8
+OPEN_CELL = 16
+
+# Tuile de mur selon ses voisins murés, indexée par le code (haut, gauche, bas, droite) sur 4 bits.
+# Le code 15 (entouré de murs) prend une tuile de coin si la diagonale correspondante est ouverte.
+WALL_TILES = numpy.array([
+    (3, 0), (3, 0), (3, 0), (2, 0),
+    (3, 0), (2, 0), (3, 0), (5, 0),
+    (3, 0), (2, 1), (3, 0), (4, 0),
+    (3, 1), (4, 1), (5, 1), (0, 0),
+], dtype=numpy.uint16)
+
+HORIZONTAL = 1
+VERTICAL = 2
+LEFT = 1
+RIGHT = 2
+UP = 3
+DOWN = 4
+
+# Entrée d'un personnage pour un tick : combinaison de ces bits, indépendante du clavier utilisé.
+MOVE_RIGHT = 1
+MOVE_LEFT = 2
+MOVE_UP = 4
+MOVE_DOWN = 8
+
+FOOTSTEP_SOUND_PATHS = [
+    "sounds/snow_step_1.wav",
+    "sounds/snow_step_2.wav",
+    "sounds/snow_step_3.wav",
+    "sounds/snow_step_4.wav",
+    "sounds/snow_step_5.wav",
+    "sounds/snow_step_6.wav",
+    "sounds/snow_step_7.wav",
+]
+FOOTSTEP_VOLUME = 0.08
+VICTORY_SOUND_PATH = "sounds/victory_by_xtrgamr.wav"
+GAME_OVER_SOUND_PATH = "sounds/game_over_by_Leszek_Szary.wav"
+# Son joué quand le père atteint le fils ; celui de fin de partie en attendant un son dédié.
+CAUGHT_SOUND_PATH = GAME_OVER_SOUND_PATH
+CAUGHT_VOLUME = 0.6
+# Priorités des sons pour l'attribution des voix : un son ne coupe jamais un son de priorité supérieure.
+FOOTSTEP_PRIORITY = 0
+CAUGHT_PRIORITY = 5
+OUTCOME_PRIORITY = 10 # Victoire et fin de partie
+AMBIENT_SOUND_PATH = "sounds/Wendy Carlos - Main Title (The Shining).flac"
+AMBIENT_VOLUME = 0.3
+GAME_OVER_TIMEOUT = 120
+# Traces gardées par personnage (une par case quittée) ; au-delà, les plus anciennes sont écrasées.
+TRACE_CAPACITY = 1024
+# Les empreintes s'effacent de la carte au bout de FOOTPRINT_LIFETIME ticks, ou plus tôt au-delà de FOOTPRINT_CAPACITY tuiles.
+FOOTPRINT_LIFETIME = 15 * FPS
+FOOTPRINT_CAPACITY = 4096
+# Taille (en cases du tableau) au-delà de laquelle le générateur par défaut est le Kruskal vectorisé : le parcours
+# en profondeur, en Python, prend environ 0,3 s par million de cases (plus d'une seconde en 2000x2000).
+BACKTRACKER_MAX_CELLS = 1000 * 1000
+# Champs de distance du pilote automatique : complets jusqu'à PURSUIT_FULL_FIELD_CELLS cases (une dizaine de ms par
+# changement de case du fils), bornés à PURSUIT_RADIUS cases de chemin au-delà (environ 1 ms sur 999x999).
+PURSUIT_FULL_FIELD_CELLS = 160 * 160
+PURSUIT_RADIUS = 256
+
+def default_algorithm(width, height):
+    return "backtracker" if width * height <= BACKTRACKER_MAX_CELLS else "kruskal"
+
+
+class LabyrinthModel:
+    def __init__(self, width=LABYRINTH_WIDTH, height=LABYRINTH_HEIGHT, seed=None, algorithm=None):
+        self.generate_array(width, height, seed, algorithm)
+
+    def generate_array(self, width, height, seed=None, algorithm=None):
+        # Génération itérative (sans récursion) et reproductible : une même graine donne le même labyrinthe.
+        # "backtracker" garde les longs couloirs du parcours en profondeur,
+        # "kruskal" est entièrement vectorisé pour les très grands labyrinthes,
+        # "chunked" assemble les morceaux de ChunkedLabyrinthModel pour la même graine.
+        # Sans algorithme imposé, default_algorithm choisit selon la taille ; self.algorithm garde le nom retenu.
+        if algorithm is None:
+            algorithm = default_algorithm(width, height)
+        rng = numpy.random.default_rng(seed)
+        if algorithm == "backtracker":
+            labyrinth_array = self.carve_backtracker(width, height, rng)
+        elif algorithm == "kruskal":
+            labyrinth_array = self.carve_kruskal(width, height, rng)
+        elif algorithm == "chunked":
+            labyrinth_array = ChunkedLabyrinthModel(width, height, seed).materialize()
+        else:
+            raise ValueError(f"Algorithme de génération inconnu : {algorithm}")
+        self.load_array(labyrinth_array, seed, algorithm)
+
+    def load_array(self, labyrinth_array, seed=None, algorithm="backtracker"):
+        # Adopte un tableau de murs (largeur, hauteur) déjà généré, par exemple lu dans un magasin de labyrinthes.
+        self.seed = seed
+        self.algorithm = algorithm
+        self.width, self.height = width, height = labyrinth_array.shape
+        self.labyrinth_array = labyrinth_array
+
+        # L'entrée et la sortie sont sur une ligne impaire pour déboucher sur une case du labyrinthe.
+        row = height // 2 | 1
+        self.start_position = (0, row)
+        self.end_position = (width - 1, row)
+        labyrinth_array[self.start_position] = False
+        # Pour une largeur paire, la sortie traverse aussi la colonne de mur qui la sépare de la dernière case.
+        labyrinth_array[2 * ((width - 1) // 2):width, row] = False
+        self.open_mask = self.build_open_mask(labyrinth_array)
+
+    @staticmethod
+    def carve_backtracker(width, height, rng):
+        # Parcours en profondeur avec une pile explicite sur un tableau plat bordé de deux cases,
+        # ce qui évite les tests de bornes dans la boucle.
+        stride = height + 4
+        walls = bytearray(b"\x01") * ((width + 4) * stride)
+        visited = bytearray(walls)
+        for x in range(1, width - 1, 2):
+            column = (x + 2) * stride + 2
+            visited[column + 1:column + height - 1:2] = bytes(len(range(1, height - 1, 2)))
+
+        # Un ordre de directions tiré d'avance par case remplace le random.shuffle de chaque appel.
+        steps = (2 * stride, -2 * stride, 2, -2)
+        orders = [tuple(steps[i] for i in order) for order in itertools.permutations(range(4))]
+        cell_orders = rng.integers(0, len(orders), size=len(walls), dtype=numpy.uint8).tobytes()
+
+        cell = (1 + 2) * stride + (height // 2 | 1) + 2
+        walls[cell] = 0
+        visited[cell] = 1
+        stack = [cell]
+        while stack:
+            cell = stack[-1]
+            for step in orders[cell_orders[cell]]:
+                jump = cell + step
+                if not visited[jump]:
+                    visited[jump] = 1
+                    walls[jump] = walls[cell + step // 2] = 0
+                    stack.append(jump)
+                    break
+            else:
+                stack.pop()
+
+        walls = numpy.frombuffer(walls, dtype=numpy.uint8).reshape(width + 4, stride)
+        return walls[2:-2, 2:-2].astype(bool)
+
+    @staticmethod
+    def carve_kruskal(width, height, rng):
+        # Arbre couvrant de poids minimal sur des poids aléatoires (Kruskal), calculé par fusions
+        # de composantes à la Borůvka : chaque tour traite toutes les composantes d'un coup.
+        cells_x, cells_y = (width - 1) // 2, (height - 1) // 2
+        node_count = cells_x * cells_y
+        nodes = numpy.arange(node_count).reshape(cells_x, cells_y)
+        horizontal_count = (cells_x - 1) * cells_y
+        u = numpy.concatenate((nodes[:-1, :].ravel(), nodes[:, :-1].ravel()))
+        v = numpy.concatenate((nodes[1:, :].ravel(), nodes[:, 1:].ravel()))
+        edges = numpy.arange(u.size)
+        opened = numpy.zeros(u.size, dtype=bool)
+
+        # Poids aléatoires dans les bits de poids fort, position de l'arête dans les bits de poids faible :
+        # le minimum par composante désigne directement l'arête choisie.
+        shift = max(u.size.bit_length(), 1)
+        weights = rng.integers(0, 1 << (62 - shift), size=u.size) << shift
+        while u.size:
+            keys = weights | numpy.arange(u.size)
+            best = numpy.full(node_count, numpy.iinfo(numpy.int64).max)
+            numpy.minimum.at(best, u, keys)
+            numpy.minimum.at(best, v, keys)
+            chosen = best & ((1 << shift) - 1)
+            opened[edges[chosen]] = True
+
+            components = numpy.arange(node_count)
+            parent = numpy.where(u[chosen] == components, v[chosen], u[chosen])
+            mutual = (parent[parent] == components) & (components < parent)
+            parent[mutual] = components[mutual]
+            while True:
+                grand_parent = parent[parent]
+                if numpy.array_equal(grand_parent, parent):
+                    break
+                parent = grand_parent
+
+            roots = parent == components
+            labels = (numpy.cumsum(roots) - 1)[parent]
+            node_count = int(roots.sum())
+            u, v = labels[u], labels[v]
+            keep = u != v
+            u, v, edges, weights = u[keep], v[keep], edges[keep], weights[keep]
+
+        labyrinth_array = numpy.ones((width, height), dtype=bool)
+        labyrinth_array[1:2 * cells_x:2, 1:2 * cells_y:2] = False
+        labyrinth_array[2:2 * cells_x - 1:2, 1:2 * cells_y:2] = ~opened[:horizontal_count].reshape(cells_x - 1, cells_y)
+        labyrinth_array[1:2 * cells_x:2, 2:2 * cells_y - 1:2] = ~opened[horizontal_count:].reshape(cells_x, cells_y - 1)
+        return labyrinth_array
+
+    @staticmethod
+    def build_open_mask(labyrinth_array):
+        # Masque uint8 des directions ouvertes par case, partagé par les collisions, les tuiles et la recherche de chemin.
+        # Les booléens vus comme des octets 0/1 se multiplient directement par chaque bit, sans tableau intermédiaire.
+        paths = (~labyrinth_array).view(numpy.uint8)
+        open_mask = paths * numpy.uint8(OPEN_CELL)
+        open_mask[:-1, :] |= paths[1:, :] * numpy.uint8(OPEN_RIGHT)
+        open_mask[:, :-1] |= paths[:, 1:] * numpy.uint8(OPEN_DOWN)
+        open_mask[1:, :] |= paths[:-1, :] * numpy.uint8(OPEN_LEFT)
+        open_mask[:, 1:] |= paths[:, :-1] * numpy.uint8(OPEN_UP)
+        return open_mask
+
+    @staticmethod
+    def build_tiles(open_mask, inside=None):
+        # Calcule la tuile de chaque case de la carte pour toute la grille à la fois à partir du masque :
+        # chaque case du labyrinthe couvre 2x2 tuiles, traitées comme quatre sous-grilles.
+        # inside donne par case les directions dont le voisin est dans le labyrinthe, par défaut toute la grille.
+        width, height = open_mask.shape
+        if inside is None:
+            inside = numpy.zeros_like(open_mask)
+            inside[:-1, :] |= OPEN_RIGHT
+            inside[:, :-1] |= OPEN_DOWN
+            inside[1:, :] |= OPEN_LEFT
+            inside[:, 1:] |= OPEN_UP
+        # Les voisins hors de la grille ne comptent pas comme des murs.
+        walled = ~open_mask & inside
+        above = numpy.zeros_like(open_mask)
+        above[:, 1:] = open_mask[:, :-1]
+        below = numpy.zeros_like(open_mask)
+        below[:, :-1] = open_mask[:, 1:]
+        is_path = (open_mask & OPEN_CELL).astype(bool)
+
+        tiles = numpy.zeros((width, LABYRINTH_TO_MAP_SCALE, height, LABYRINTH_TO_MAP_SCALE, 2), dtype=numpy.uint16)
+        for sub_x, sub_y in itertools.product(range(LABYRINTH_TO_MAP_SCALE), repeat=2):
+            # Dans une case murée, la moitié opposée de chaque axe touche toujours du mur.
+            code = walled | (OPEN_LEFT if sub_x else OPEN_RIGHT) | (OPEN_UP if sub_y else OPEN_DOWN)
+            diagonal_open = (above if sub_y == 0 else below) & (OPEN_RIGHT if sub_x else OPEN_LEFT)
+            corner = numpy.where(diagonal_open.astype(bool)[..., None], numpy.uint16((6 + sub_x, sub_y)), numpy.uint16(0))
+            sub_tiles = numpy.where((code == 15)[..., None], corner, WALL_TILES[code])
+            sub_tiles[is_path] = 0
+            tiles[:, sub_x, :, sub_y] = sub_tiles
+        return tiles.reshape(width * LABYRINTH_TO_MAP_SCALE, height * LABYRINTH_TO_MAP_SCALE, 2)
+
+
+class ChunkedLabyrinthModel:
+    # Labyrinthe de taille quelconque généré par morceaux de CHUNK_SIZE cases, à la demande et dans n'importe quel
+    # ordre : chaque morceau est un labyrinthe parfait tiré de sa propre graine (seed, x, y), et chaque morceau ouvre
+    # une porte vers l'est ou vers le sud comme un labyrinthe en arbre binaire, ce qui garde l'ensemble parfait.
+    # Seuls les derniers morceaux lus restent en mémoire : la mémoire ne dépend pas de la taille du labyrinthe.
+    # open_mask se lit comme le tableau de LabyrinthModel, par case ou par tableaux d'indices.
+    algorithm = "chunked"
+
+    def __init__(self, width, height, seed=None, chunk_size=CHUNK_SIZE, cache_size=64):
+        if width % 2 == 0 or height % 2 == 0 or chunk_size % 2:
+            raise ValueError("Un labyrinthe par morceaux a des côtés impairs et des morceaux de côté pair")
+        self.seed = seed
+        self.entropy = seed if seed is not None else numpy.random.SeedSequence().entropy
+        self.width = width
+        self.height = height
+        self.chunk_size = chunk_size
+        # Le dernier morceau de chaque axe s'étend jusqu'au bord et garde le mur extérieur.
+        self.chunks_x = -(-(width - 1) // chunk_size)
+        self.chunks_y = -(-(height - 1) // chunk_size)
+        row = height // 2 | 1
+        self.start_position = (0, row)
+        self.end_position = (width - 1, row)
+        self.cache_size = cache_size
+        self._walls = collections.OrderedDict() # (x, y) du morceau -> murs, en LRU
+        self._masks = collections.OrderedDict() # (x, y) du morceau -> masque des directions ouvertes, en LRU
+        self.open_mask = ChunkedOpenMask(self)
+
+    def chunk_of(self, x, y):
+        # Morceau contenant la case (x, y), pour des entiers ou des tableaux d'indices.
+        return numpy.minimum(x // self.chunk_size, self.chunks_x - 1), numpy.minimum(y // self.chunk_size, self.chunks_y - 1)
+
+    def chunk_bounds(self, chunk_x, chunk_y):
+        # (x, y, largeur, hauteur) du morceau en cases du labyrinthe.
+        x, y = chunk_x * self.chunk_size, chunk_y * self.chunk_size
+        width = self.width - x if chunk_x == self.chunks_x - 1 else self.chunk_size
+        height = self.height - y if chunk_y == self.chunks_y - 1 else self.chunk_size
+        return x, y, width, height
+
+    def door(self, chunk_x, chunk_y):
+        # Porte du morceau vers son voisin : (RIGHT ou DOWN, rang de la case sur le bord commun), ou None pour
+        # le dernier morceau. Sur la dernière colonne de morceaux la porte va au sud, sur la dernière ligne à l'est.
+        last_x = chunk_x == self.chunks_x - 1
+        last_y = chunk_y == self.chunks_y - 1
+        if last_x and last_y:
+            return None
+        rng = numpy.random.default_rng((self.entropy, chunk_x, chunk_y, 1))
+        direction = DOWN if last_x else RIGHT if last_y else (RIGHT, DOWN)[rng.integers(2)]
+        _, _, width, height = self.chunk_bounds(chunk_x, chunk_y)
+        length = height if direction == RIGHT else width
+        # Les cases du morceau sont sur les rangs impairs ; le dernier morceau compte aussi son mur extérieur.
+        cells = (length - 1) // 2 if length % 2 else length // 2
+        return direction, 2 * int(rng.integers(cells)) + 1
+
+    def generate_chunk(self, chunk_x, chunk_y):
+        # Murs (largeur, hauteur) du morceau, bord ouest et bord nord compris : les portes des voisins y sont percées.
+        x, y, width, height = self.chunk_bounds(chunk_x, chunk_y)
+        carve_width = width if width % 2 else width + 1
+        carve_height = height if height % 2 else height + 1
+        rng = numpy.random.default_rng((self.entropy, chunk_x, chunk_y))
+        walls = LabyrinthModel.carve_backtracker(carve_width, carve_height, rng)[:width, :height]
+        if chunk_x > 0:
+            door = self.door(chunk_x - 1, chunk_y)
+            if door is not None and door[0] == RIGHT:
+                walls[0, door[1]] = False
+        if chunk_y > 0:
+            door = self.door(chunk_x, chunk_y - 1)
+            if door is not None and door[0] == DOWN:
+                walls[door[1], 0] = False
+
+        # Entrée et sortie, sur la même ligne que dans LabyrinthModel.
+        row = self.start_position[1] - y
+        if 0 <= row < height:
+            if chunk_x == 0:
+                walls[0, row] = False
+            if chunk_x == self.chunks_x - 1:
+                walls[-1, row] = False
+        return walls
+
+    def _cached(self, cache, key, build):
+        value = cache.get(key)
+        if value is not None:
+            cache.move_to_end(key)
+            return value
+        value = cache[key] = build(*key)
+        if len(cache) > self.cache_size:
+            cache.popitem(last=False)
+        return value
+
+    def has_chunk(self, chunk_x, chunk_y):
+        return 0 <= chunk_x < self.chunks_x and 0 <= chunk_y < self.chunks_y
+
+    def chunk_walls(self, chunk_x, chunk_y):
+        return self._cached(self._walls, (chunk_x, chunk_y), self.generate_chunk)
+
+    def chunk_mask(self, chunk_x, chunk_y):
+        return self._cached(self._masks, (chunk_x, chunk_y), self.build_chunk_mask)
+
+    def build_chunk_mask(self, chunk_x, chunk_y):
+        # Masque des directions ouvertes du morceau, calculé sur ses murs bordés d'une case des morceaux voisins.
+        walls = self.window(self.chunk_walls, chunk_x, chunk_y, True)
+        return LabyrinthModel.build_open_mask(walls)[1:-1, 1:-1]
+
+    def chunk_tiles(self, chunk_x, chunk_y):
+        # Tuiles de la carte du morceau, identiques à celles de LabyrinthModel.build_tiles sur tout le labyrinthe :
+        # hors du labyrinthe, les voisins ne comptent pas comme des murs.
+        open_mask = self.window(self.chunk_mask, chunk_x, chunk_y, 0)
+        outside = self.window(lambda x, y: numpy.zeros(self.chunk_bounds(x, y)[2:], dtype=bool), chunk_x, chunk_y, True)
+        inside = LabyrinthModel.build_open_mask(outside) & (OPEN_RIGHT | OPEN_DOWN | OPEN_LEFT | OPEN_UP)
+        scale = LABYRINTH_TO_MAP_SCALE
+        return LabyrinthModel.build_tiles(open_mask, inside)[scale:-scale, scale:-scale]
+
+    def window(self, chunk_array, chunk_x, chunk_y, fill):
+        # Tableau du morceau entouré d'une case lue sur les bords des quatre voisins (fill hors du labyrinthe).
+        center = chunk_array(chunk_x, chunk_y)
+        width, height = center.shape
+        window = numpy.full((width + 2, height + 2), fill, dtype=center.dtype)
+        window[1:-1, 1:-1] = center
+        if self.has_chunk(chunk_x + 1, chunk_y):
+            window[-1, 1:-1] = chunk_array(chunk_x + 1, chunk_y)[0, :]
+        if self.has_chunk(chunk_x - 1, chunk_y):
+            window[0, 1:-1] = chunk_array(chunk_x - 1, chunk_y)[-1, :]
+        if self.has_chunk(chunk_x, chunk_y + 1):
+            window[1:-1, -1] = chunk_array(chunk_x, chunk_y + 1)[:, 0]
+        if self.has_chunk(chunk_x, chunk_y - 1):
+            window[1:-1, 0] = chunk_array(chunk_x, chunk_y - 1)[:, -1]
+        return window
+
+    def materialize(self):
+        # Tableau de murs complet, comme LabyrinthModel.labyrinth_array, sans passer par le cache des morceaux.
+        labyrinth_array = numpy.empty((self.width, self.height), dtype=bool)
+        for chunk_x, chunk_y in itertools.product(range(self.chunks_x), range(self.chunks_y)):
+            x, y, width, height = self.chunk_bounds(chunk_x, chunk_y)
+            labyrinth_array[x:x + width, y:y + height] = self.generate_chunk(chunk_x, chunk_y)
+        return labyrinth_array
+
+
+class ChunkedOpenMask:
+    # Vue de ChunkedLabyrinthModel qui se lit comme LabyrinthModel.open_mask : open_mask[x, y] pour une case,
+    # ou pour des tableaux d'indices (un accès par morceau concerné, pas par case).
+    def __init__(self, labyrinth):
+        self.labyrinth = labyrinth
+
+    @property
+    def shape(self):
+        return (self.labyrinth.width, self.labyrinth.height)
+
+    def __getitem__(self, index):
+        labyrinth = self.labyrinth
+        size = labyrinth.chunk_size
+        x, y = index
+        if not isinstance(x, numpy.ndarray) and not isinstance(y, numpy.ndarray):
+            chunk_x = min(x // size, labyrinth.chunks_x - 1)
+            chunk_y = min(y // size, labyrinth.chunks_y - 1)
+            return labyrinth.chunk_mask(chunk_x, chunk_y)[x - chunk_x * size, y - chunk_y * size]
+
+        x, y = numpy.broadcast_arrays(x, y)
+        chunk_x, chunk_y = labyrinth.chunk_of(x, y)
+        keys = chunk_x * labyrinth.chunks_y + chunk_y
+        values = numpy.empty(x.shape, dtype=numpy.uint8)
+        for key in numpy.unique(keys).tolist():
+            selected = keys == key
+            key_x, key_y = divmod(key, labyrinth.chunks_y)
+            values[selected] = labyrinth.chunk_mask(key_x, key_y)[x[selected] - key_x * size, y[selected] - key_y * size]
+        return values
+
+
+class TraceBuffer:
+    # Traces (x, y, orientation, tick) de plusieurs personnages, dans un tampon circulaire numpy de capacity traces
+    # par personnage : la mémoire est fixée à la création, quelle que soit la durée de la partie.
+    # Rangé en (rang, personnage) : les personnages qui avancent ensemble écrivent côte à côte.
+    def __init__(self, count, capacity=TRACE_CAPACITY):
+        self.capacity = capacity
+        self.x = numpy.zeros((capacity, count), dtype=numpy.int32)
+        self.y = numpy.zeros((capacity, count), dtype=numpy.int32)
+        self.orientation = numpy.zeros((capacity, count), dtype=numpy.int8)
+        self.tick = numpy.zeros((capacity, count), dtype=numpy.int32)
+        self.total = numpy.zeros(count, dtype=numpy.int64) # Traces laissées depuis le début, par personnage
+
+    def add(self, character, x, y, orientation, tick):
+        slot = self.total[character] % self.capacity
+        self.x[slot, character] = x
+        self.y[slot, character] = y
+        self.orientation[slot, character] = orientation
+        self.tick[slot, character] = tick
+        self.total[character] += 1
+
+    def add_many(self, characters, x, y, orientation, tick):
+        # characters est trié : les traces d'un même personnage sont rangées dans l'ordre donné.
+        if not len(characters):
+            return
+        rank = numpy.arange(len(characters)) - numpy.searchsorted(characters, characters)
+        slots = (self.total[characters] + rank) % self.capacity
+        self.x[slots, characters] = x
+        self.y[slots, characters] = y
+        self.orientation[slots, characters] = orientation
+        self.tick[slots, characters] = tick
+        numpy.add.at(self.total, characters, 1)
+
+    def slots(self, character):
+        # Rangs du tampon occupés par le personnage, de la plus ancienne trace à la plus récente.
+        total = int(self.total[character])
+        count = min(total, self.capacity)
+        return numpy.arange(total - count, total) % self.capacity
+
+    def traces(self, character):
+        # Traces encore gardées, sous la forme [x, y, orientation] de la plus ancienne à la plus récente.
+        slots = self.slots(character)
+        return numpy.stack((self.x[slots, character], self.y[slots, character], self.orientation[slots, character]), axis=1).tolist()
+
+    def ages(self, character, tick):
+        return tick - self.tick[self.slots(character), character]
+
+
+class FootprintTrail:
+    # Empreintes posées sur la carte, dans un tampon circulaire de capacity tuiles (x, y, u, v, tick). Une empreinte
+    # s'efface au bout de lifetime ticks, ou quand le tampon déborde, sauf si une plus récente couvre la même tuile.
+    # Le coût d'une mise à jour ne dépend que du nombre d'empreintes posées et effacées pendant le tick.
+    def __init__(self, capacity=FOOTPRINT_CAPACITY, lifetime=FOOTPRINT_LIFETIME):
+        self.capacity = capacity
+        self.lifetime = lifetime
+        self.rows = numpy.zeros((capacity, 5), dtype=numpy.int64)
+        self.first = 0 # Rang de la plus ancienne empreinte encore posée
+        self.total = 0 # Empreintes posées depuis le début
+        self.latest = {} # (x, y) -> rang de la dernière empreinte posée sur cette tuile
+
+    def __len__(self):
+        return self.total - self.first
+
+    def update(self, footprints, tick):
+        # Ajoute les empreintes (n, 4) (x, y, u, v) du tick et renvoie les tuiles (x, y) à rendre au labyrinthe.
+        footprints = numpy.asarray(footprints, dtype=numpy.int64).reshape(-1, 4)[-self.capacity:]
+        capacity = self.capacity
+        rows = self.rows
+        first = max(self.first, self.total + len(footprints) - capacity)
+        while first < self.total and rows[first % capacity, 4] <= tick - self.lifetime:
+            first += 1
+
+        cleared = []
+        latest = self.latest
+        for rank in range(self.first, first):
+            key = tuple(rows[rank % capacity, :2].tolist())
+            if latest.get(key) == rank:
+                del latest[key]
+                cleared.append(key)
+        self.first = first
+
+        if len(footprints):
+            slots = numpy.arange(self.total, self.total + len(footprints)) % capacity
+            rows[slots, :4] = footprints
+            rows[slots, 4] = tick
+            for rank, key in enumerate(map(tuple, footprints[:, :2].tolist()), self.total):
+                latest[key] = rank
+            self.total += len(footprints)
+        return numpy.array([key for key in cleared if key not in latest], dtype=numpy.int64).reshape(-1, 2)
+
+    def live(self):
+        # Empreintes encore posées (x, y, u, v), de la plus ancienne à la plus récente.
+        return self.rows[numpy.arange(self.first, self.total) % self.capacity, :4]
+
+
+class CharacterModel:
+    def __init__(self, position, labyrinth, character_id, direction=DOWN):
+        self.x = position[0] * LABYRINTH_TO_SCREEN_SCALE
+        self.y = position[1] * LABYRINTH_TO_SCREEN_SCALE
+        self.direction = direction
+
+        self.ticks = 0
+        self.trace_buffer = TraceBuffer(1)
+        self.footprints = [] # Tuiles d'empreintes (x, y, tuile) posées pendant le dernier tick
+        self.moving = False
+        self.exited = False
+
+        self.labyrinth = labyrinth
+        self.character_id = character_id
+
+        self.last_sound_position = (self.x // PATH_SIZE, self.y // PATH_SIZE)
+        self.footstep_index = 0
+
+    @property
+    def traces(self):
+        # Dernières traces [x, y, orientation], au plus TRACE_CAPACITY.
+        return self.trace_buffer.traces(0)
+
+    def step(self, keys):
+        # Applique une entrée (combinaison de MOVE_*) pour un tick.
+        # Renvoie True quand le personnage entre dans une nouvelle case et doit faire un bruit de pas.
+        self.ticks += 1
+        self.footprints = footprints = []
+        if self.exited:
+            return False
+
+        x = self.x
+        y = self.y
+        open_mask = self.labyrinth.open_mask
+        direction = None
+
+        current_grid_x = x // PATH_SIZE
+        current_grid_y = y // PATH_SIZE
+
+        if (current_grid_x, current_grid_y) == self.labyrinth.end_position:
+            self.exited = True
+            return False
+
+        if keys & MOVE_RIGHT:
+            new_x = x + SPEED
+            if current_grid_x == self.labyrinth.width - 1:
+                new_x = min(new_x, (self.labyrinth.width - 1) * PATH_SIZE)
+            elif not (open_mask[current_grid_x, current_grid_y] &
+                      open_mask[current_grid_x, (y + PATH_SIZE - 1) // PATH_SIZE] & OPEN_RIGHT):
+                new_x = current_grid_x * PATH_SIZE
+            if new_x != x:
+                if new_x // PATH_SIZE != current_grid_x:
+                    self.trace_buffer.add(0, current_grid_x, current_grid_y, HORIZONTAL, self.ticks)
+                footprints.append((x // TILE_SIZE + 1, y // TILE_SIZE + 1, (8, 1)))
+                footprints.append((x // TILE_SIZE + 1, y // TILE_SIZE, (9, 1)))
+                x = new_x
+                direction = RIGHT
+
+        elif keys & MOVE_LEFT:
+            new_x = x - SPEED
+            if new_x < 0:
+                new_x = 0
+            else:
+                # Tant que le pas reste dans la colonne courante, seule la case elle-même compte.
+                next_col_idx = new_x // PATH_SIZE
+                side = OPEN_LEFT if next_col_idx != current_grid_x else OPEN_CELL
+                if not (open_mask[current_grid_x, current_grid_y] &
+                        open_mask[current_grid_x, (y + PATH_SIZE - 1) // PATH_SIZE] & side):
+                    new_x = (next_col_idx + 1) * PATH_SIZE
+            if new_x != x:
+                if new_x // PATH_SIZE != current_grid_x:
+                    self.trace_buffer.add(0, current_grid_x, current_grid_y, HORIZONTAL, self.ticks)
+                footprints.append((new_x // TILE_SIZE + 1, y // TILE_SIZE + 1, (8, 1)))
+                footprints.append((new_x // TILE_SIZE + 1, y // TILE_SIZE, (9, 1)))
+                x = new_x
+                direction = LEFT
+
+        if keys & MOVE_DOWN:
+            new_y = y + SPEED
+            if current_grid_y == self.labyrinth.height - 1:
+                new_y = min(new_y, (self.labyrinth.height - 1) * PATH_SIZE)
+            elif not (open_mask[current_grid_x, current_grid_y] &
+                      open_mask[(x + PATH_SIZE - 1) // PATH_SIZE, current_grid_y] & OPEN_DOWN):
+                new_y = current_grid_y * PATH_SIZE
+            if y != new_y:
+                if new_y // PATH_SIZE != current_grid_y:
+                    self.trace_buffer.add(0, current_grid_x, current_grid_y, VERTICAL, self.ticks)
+                footprints.append((x // TILE_SIZE + 1, y // TILE_SIZE + 1, (9, 0)))
+                footprints.append((x // TILE_SIZE, y // TILE_SIZE + 1, (8, 0)))
+                y = new_y
+                direction = DOWN
+
+        elif keys & MOVE_UP:
+            new_y = y - SPEED
+            if new_y < 0:
+                new_y = 0
+            else:
+                next_row_idx = new_y // PATH_SIZE
+                side = OPEN_UP if next_row_idx != current_grid_y else OPEN_CELL
+                if not (open_mask[current_grid_x, current_grid_y] &
+                        open_mask[(x + PATH_SIZE - 1) // PATH_SIZE, current_grid_y] & side):
+                    new_y = (next_row_idx + 1) * PATH_SIZE
+            if y != new_y:
+                if new_y // PATH_SIZE != current_grid_y:
+                    self.trace_buffer.add(0, current_grid_x, current_grid_y, VERTICAL, self.ticks)
+                footprints.append((x // TILE_SIZE + 1, new_y // TILE_SIZE + 1, (9, 0)))
+                footprints.append((x // TILE_SIZE, new_y // TILE_SIZE + 1, (8, 0)))
+                y = new_y
+                direction = UP
+
+        self.x = x
+        self.y = y
+
+        if direction is None:
+            self.moving = False
+        else:
+            self.moving = True
+            self.direction = direction
+
+            current_grid_pos = (self.x // PATH_SIZE, self.y // PATH_SIZE)
+            if current_grid_pos != self.last_sound_position:
+                self.last_sound_position = current_grid_pos
+                return True
+        return False
+
+
+    def footstep_cue(self, game_time):
+        # Arguments d'un SoundEvent de bruit de pas ; le son est résolu par le cache audio à partir du chemin.
+        path = FOOTSTEP_SOUND_PATHS[self.footstep_index % len(FOOTSTEP_SOUND_PATHS)]
+        panoramique = self.x / SCREEN_WIDTH
+        self.footstep_index += 1
+        return (game_time, path, FOOTSTEP_VOLUME, panoramique, self.character_id, FOOTSTEP_PRIORITY)
+
+
+class CharacterSwarm:
+    # Personnages d'une partie rangés en tableaux numpy (un élément par personnage) : un seul pas vectorisé
+    # par tick applique à tous les règles de CharacterModel.step, collisions avec les murs comprises.
+    def __init__(self, positions, labyrinth, character_ids, direction=DOWN, trace_capacity=TRACE_CAPACITY):
+        self.labyrinth = labyrinth
+        self.character_ids = list(character_ids)
+        count = len(self.character_ids)
+        # Une seule position (x, y) place tous les personnages sur la même case.
+        positions = numpy.broadcast_to(numpy.asarray(positions, dtype=numpy.int64).reshape(-1, 2), (count, 2))
+        self.x = positions[:, 0] * LABYRINTH_TO_SCREEN_SCALE
+        self.y = positions[:, 1] * LABYRINTH_TO_SCREEN_SCALE
+        self.direction = numpy.full(count, direction, dtype=numpy.int8)
+        self.moving = numpy.zeros(count, dtype=bool)
+        self.exited = numpy.zeros(count, dtype=bool)
+
+        self.ticks = 0
+        self.trace_buffer = TraceBuffer(count, trace_capacity)
+        self.footprints = numpy.zeros((0, 5), dtype=numpy.int64) # (personnage, x, y, u, v) posées pendant le dernier tick
+
+        self.last_sound_x = self.x // PATH_SIZE
+        self.last_sound_y = self.y // PATH_SIZE
+        self.footstep_index = numpy.zeros(count, dtype=numpy.int64)
+
+    def __len__(self):
+        return len(self.character_ids)
+
+    @property
+    def traces(self):
+        # Traces de chaque personnage sous la forme de CharacterModel.traces.
+        return [self.trace_buffer.traces(index) for index in range(len(self))]
+
+    @staticmethod
+    def footprint_rows(characters, tile_x, tile_y, tiles):
+        # Deux tuiles d'empreinte par personnage déplacé : tile_x et tile_y de forme (n, 2), tiles deux (u, v).
+        rows = numpy.empty((len(characters), 2, 5), dtype=numpy.int64)
+        rows[:, :, 0] = characters[:, None]
+        rows[:, :, 1] = tile_x
+        rows[:, :, 2] = tile_y
+        rows[:, :, 3:] = tiles
+        return rows.reshape(-1, 5)
+
+    def open_cells(self, x, y):
+        # Masque des directions ouvertes aux cases (x, y) de chaque personnage.
+        return self.labyrinth.open_mask[x, y]
+
+    def step(self, inputs):
+        # Applique une combinaison de MOVE_* par personnage pour un tick.
+        # Renvoie le masque des personnages entrés dans une nouvelle case, qui doivent faire un bruit de pas.
+        self.ticks += 1
+        keys = numpy.asarray(inputs, dtype=numpy.int64)
+        labyrinth = self.labyrinth
+        open_cells = self.open_cells
+        x = self.x
+        y = self.y
+        grid_x = x // PATH_SIZE
+        grid_y = y // PATH_SIZE
+
+        end_x, end_y = labyrinth.end_position
+        self.exited |= (grid_x == end_x) & (grid_y == end_y)
+        active = ~self.exited
+        cell = open_cells(grid_x, grid_y)
+
+        # Axe horizontal, la droite l'emporte sur la gauche ; même règle de bord et de mur que CharacterModel.step.
+        right = active & ((keys & MOVE_RIGHT) != 0)
+        left = active & ~right & ((keys & MOVE_LEFT) != 0)
+        side_open = cell & open_cells(grid_x, (y + PATH_SIZE - 1) // PATH_SIZE)
+        right_x = numpy.where(
+            grid_x == labyrinth.width - 1,
+            numpy.minimum(x + SPEED, (labyrinth.width - 1) * PATH_SIZE),
+            numpy.where(side_open & OPEN_RIGHT, x + SPEED, grid_x * PATH_SIZE),
+        )
+        left_x = x - SPEED
+        next_column = left_x // PATH_SIZE
+        left_open = side_open & numpy.where(next_column != grid_x, OPEN_LEFT, OPEN_CELL)
+        left_x = numpy.where(left_x < 0, 0, numpy.where(left_open, left_x, (next_column + 1) * PATH_SIZE))
+        new_x = numpy.where(right, right_x, numpy.where(left, left_x, x))
+        moved_x = new_x != x
+
+        # Axe vertical, le bas l'emporte sur le haut, testé depuis la nouvelle abscisse.
+        down = active & ((keys & MOVE_DOWN) != 0)
+        up = active & ~down & ((keys & MOVE_UP) != 0)
+        side_open = cell & open_cells((new_x + PATH_SIZE - 1) // PATH_SIZE, grid_y)
+        down_y = numpy.where(
+            grid_y == labyrinth.height - 1,
+            numpy.minimum(y + SPEED, (labyrinth.height - 1) * PATH_SIZE),
+            numpy.where(side_open & OPEN_DOWN, y + SPEED, grid_y * PATH_SIZE),
+        )
+        up_y = y - SPEED
+        next_row = up_y // PATH_SIZE
+        up_open = side_open & numpy.where(next_row != grid_y, OPEN_UP, OPEN_CELL)
+        up_y = numpy.where(up_y < 0, 0, numpy.where(up_open, up_y, (next_row + 1) * PATH_SIZE))
+        new_y = numpy.where(down, down_y, numpy.where(up, up_y, y))
+        moved_y = new_y != y
+
+        # Empreintes : deux tuiles par axe parcouru, rangées par personnage puis par axe comme dans CharacterModel.step.
+        horizontal = numpy.flatnonzero(moved_x)
+        print_x = numpy.where(right, x, new_x)[horizontal] // TILE_SIZE + 1
+        tile_y = y[horizontal] // TILE_SIZE
+        vertical = numpy.flatnonzero(moved_y)
+        print_y = numpy.where(down, y, new_y)[vertical] // TILE_SIZE + 1
+        tile_x = new_x[vertical] // TILE_SIZE
+        footprints = numpy.concatenate((
+            self.footprint_rows(horizontal, numpy.stack((print_x, print_x), axis=1), numpy.stack((tile_y + 1, tile_y), axis=1), ((8, 1), (9, 1))),
+            self.footprint_rows(vertical, numpy.stack((tile_x + 1, tile_x), axis=1), numpy.stack((print_y, print_y), axis=1), ((9, 0), (8, 0))),
+        ))
+        self.footprints = footprints[numpy.argsort(footprints[:, 0], kind="stable")]
+
+        # Traces laissées en quittant une case, horizontale puis verticale pour un même personnage.
+        traced_x = numpy.flatnonzero(moved_x & (new_x // PATH_SIZE != grid_x))
+        traced_y = numpy.flatnonzero(moved_y & (new_y // PATH_SIZE != grid_y))
+        if len(traced_x) or len(traced_y):
+            traced = numpy.concatenate((traced_x, traced_y))
+            orientations = numpy.repeat((HORIZONTAL, VERTICAL), (len(traced_x), len(traced_y)))
+            order = numpy.argsort(traced, kind="stable")
+            traced, orientations = traced[order], orientations[order]
+            self.trace_buffer.add_many(traced, grid_x[traced], grid_y[traced], orientations, self.ticks)
+
+        self.x = new_x
+        self.y = new_y
+        moved = moved_x | moved_y
+        self.moving = numpy.where(active, moved, self.moving)
+        direction = numpy.where(moved_x, numpy.where(right, RIGHT, LEFT), self.direction)
+        self.direction = numpy.where(moved_y, numpy.where(down, DOWN, UP), direction).astype(numpy.int8)
+
+        sound_x = new_x // PATH_SIZE
+        sound_y = new_y // PATH_SIZE
+        stepped = moved & ((sound_x != self.last_sound_x) | (sound_y != self.last_sound_y))
+        self.last_sound_x = numpy.where(stepped, sound_x, self.last_sound_x)
+        self.last_sound_y = numpy.where(stepped, sound_y, self.last_sound_y)
+        return stepped
+
+    def footstep_cues(self, stepped, game_time):
+        # Arguments des SoundEvent de bruit de pas des personnages indiqués par le masque stepped, en un lot.
+        indices = numpy.flatnonzero(stepped)
+        path_count = len(FOOTSTEP_SOUND_PATHS)
+        sound_cues = [
+            (game_time, FOOTSTEP_SOUND_PATHS[footstep_index % path_count], FOOTSTEP_VOLUME, x / SCREEN_WIDTH, self.character_ids[index], FOOTSTEP_PRIORITY)
+            for index, x, footstep_index in zip(indices.tolist(), self.x[indices].tolist(), self.footstep_index[indices].tolist())
+        ]
+        self.footstep_index[indices] += 1
+        return sound_cues
+
+
+# Décalages dans le tableau aplati (x * hauteur + y) vers les voisins ouverts, pour chaque valeur du masque.
+def neighbor_steps(height):
+    steps = ((OPEN_RIGHT, height), (OPEN_DOWN, 1), (OPEN_LEFT, -height), (OPEN_UP, -1))
+    return [tuple(step for bit, step in steps if mask & bit) for mask in range(OPEN_CELL * 2)]
+
+
+class DistanceFieldCache:
+    # Champs de distance (parcours en largeur sur open_mask) vers une case cible, gardés en LRU par case cible
+    # sous un budget mémoire : quand la cible revient sur une case récente, son champ est réutilisé tel quel.
+    # Avec radius, le parcours s'arrête à cette distance et son coût ne dépend plus de la taille du labyrinthe.
+    def __init__(self, labyrinth, budget_bytes=64 * 1024 * 1024, radius=None):
+        self.labyrinth = labyrinth
+        self.capacity = max(1, budget_bytes // (labyrinth.width * labyrinth.height * 4))
+        self.radius = radius
+        self.hits = 0
+        self.misses = 0
+        self._fields = collections.OrderedDict()
+        self._mask = labyrinth.open_mask.ravel().tolist()
+        self._steps = neighbor_steps(labyrinth.height)
+
+    def field(self, target):
+        field = self._fields.get(target)
+        if field is not None:
+            self._fields.move_to_end(target)
+            self.hits += 1
+            return field
+        self.misses += 1
+        field = self._fields[target] = self.distance_field(target)
+        if len(self._fields) > self.capacity:
+            self._fields.popitem(last=False)
+        return field
+
+    def distance_field(self, target):
+        # Distance en cases de chaque case à target, -1 si elle n'est pas atteinte (mur, hors rayon).
+        width, height = self.labyrinth.width, self.labyrinth.height
+        mask = self._mask
+        steps = self._steps
+        # Seules les cases atteintes sont visitées : un dictionnaire évite de parcourir toute la grille en Python.
+        distances = {}
+        start = target[0] * height + target[1]
+        if mask[start] & OPEN_CELL:
+            distances[start] = 0
+            frontier = [start]
+            distance = 0
+            while frontier and (self.radius is None or distance < self.radius):
+                distance += 1
+                next_frontier = []
+                for cell in frontier:
+                    for step in steps[mask[cell]]:
+                        neighbor = cell + step
+                        if neighbor not in distances:
+                            distances[neighbor] = distance
+                            next_frontier.append(neighbor)
+                frontier = next_frontier
+
+        field = numpy.full(width * height, -1, dtype=numpy.int32)
+        field[numpy.fromiter(distances.keys(), dtype=numpy.int64, count=len(distances))] = numpy.fromiter(distances.values(), dtype=numpy.int32, count=len(distances))
+        return field.reshape(width, height)
+
+
+def descent_keys(distances_at, open_cells, x, y, width, height):
+    # Entrées MOVE_* qui font descendre un champ de distance aux personnages placés en (x, y) pixels :
+    # distances_at(cases x, cases y) lit le champ (-1 hors d'atteinte), open_cells(cases x, cases y) le masque des cases.
+    unreachable = width * height
+
+    def distances(open_side, cell_x, cell_y):
+        # Distances lues aux seules cases demandées, inatteignables quand le côté est fermé ou la case hors champ.
+        distance = distances_at(cell_x, cell_y)
+        return numpy.where((open_side != 0) & (distance >= 0), distance, unreachable)
+
+    cell_x = x // PATH_SIZE
+    cell_y = y // PATH_SIZE
+    cell_open = open_cells(cell_x, cell_y)
+    here = distances(True, cell_x, cell_y)
+    right = distances(cell_open & OPEN_RIGHT, numpy.minimum(cell_x + 1, width - 1), cell_y)
+    left = distances(cell_open & OPEN_LEFT, numpy.maximum(cell_x - 1, 0), cell_y)
+    down = distances(cell_open & OPEN_DOWN, cell_x, numpy.minimum(cell_y + 1, height - 1))
+    up = distances(cell_open & OPEN_UP, cell_x, numpy.maximum(cell_y - 1, 0))
+
+    # Case alignée : voisin le plus proche de la cible s'il rapproche, dans l'ordre droite, bas, gauche, haut.
+    neighbors = numpy.stack((right, down, left, up))
+    moves = numpy.array((MOVE_RIGHT, MOVE_DOWN, MOVE_LEFT, MOVE_UP))
+    best = neighbors.argmin(axis=0)
+    keys = numpy.where(neighbors.min(axis=0) < here, moves[best], 0)
+
+    # À cheval entre deux cases, seul l'axe en cours est praticable : on rejoint la plus proche de la cible.
+    # La case d'un personnage est celle de son coin haut-gauche, l'autre est à droite ou en dessous.
+    between_x = x % PATH_SIZE != 0
+    between_y = y % PATH_SIZE != 0
+    keys = numpy.where(between_y, numpy.where(down < here, MOVE_DOWN, MOVE_UP), keys)
+    keys = numpy.where(between_x, numpy.where(right < here, MOVE_RIGHT, MOVE_LEFT), keys)
+    return numpy.where(here < unreachable, keys, 0)
+
+
+# Directions dans le sens horaire (droite, bas, gauche, haut) : tourner à droite, c'est passer à la suivante.
+CLOCKWISE_MOVES = numpy.array((MOVE_RIGHT, MOVE_DOWN, MOVE_LEFT, MOVE_UP), dtype=numpy.int64)
+CLOCKWISE_OPEN = numpy.array((OPEN_RIGHT, OPEN_DOWN, OPEN_LEFT, OPEN_UP), dtype=numpy.uint8)
+
+
+def wall_follow_keys(open_cells, x, y, headings):
+    # Entrées MOVE_* de la main droite sur le mur pour les personnages en (x, y) pixels, qui avancent dans la direction
+    # headings (index dans CLOCKWISE_MOVES) : à chaque case, à droite, tout droit, à gauche, sinon demi-tour.
+    # Dans un labyrinthe parfait, ce parcours finit par passer partout. Renvoie (entrées, nouvelles directions).
+    cell_x = x // PATH_SIZE
+    cell_y = y // PATH_SIZE
+    cell_open = open_cells(cell_x, cell_y)
+    turns = (headings[None, :] + numpy.array((1, 0, 3, 2))[:, None]) % 4
+    possible = (cell_open[None, :] & CLOCKWISE_OPEN[turns]) != 0
+    chosen = turns[possible.argmax(axis=0), numpy.arange(len(headings))]
+    chosen = numpy.where(possible.any(axis=0), chosen, headings)
+
+    # À cheval entre deux cases, on poursuit sur l'axe en cours.
+    between_x = x % PATH_SIZE != 0
+    between_y = y % PATH_SIZE != 0
+    chosen = numpy.where(between_y, numpy.where(headings == 3, 3, 1), chosen)
+    chosen = numpy.where(between_x, numpy.where(headings == 2, 2, 0), chosen)
+    return CLOCKWISE_MOVES[chosen], chosen
+
+
+class Pursuit:
+    # Le fils (target) et ses poursuivants, désignés par leur rang dans la liste des personnages.
+    # Le contact d'un poursuivant avec le fils déclenche le son de capture ; en pilote automatique, les poursuivants
+    # descendent le champ de distance vers la case du fils (vers la sortie une fois le fils sorti), entrées MOVE_*
+    # calculées pour tous d'un coup. Le champ n'est redemandé que lorsque la case visée change.
+    # Limite : au-delà de PURSUIT_FULL_FIELD_CELLS cases, le champ s'arrête à radius cases de chemin du fils pour rester
+    # bon marché à 30 images/s ; un poursuivant hors du champ longe le mur (wall_follow_keys) jusqu'à y entrer.
+    # radius=None garde des champs complets quelle que soit la taille.
+    def __init__(self, labyrinth, target=0, pursuers=(1,), autopilot=False, field_cache=None, radius=PURSUIT_RADIUS):
+        self.labyrinth = labyrinth
+        self.target = target
+        self.pursuers = numpy.asarray(pursuers, dtype=numpy.int64)
+        self.autopilot = autopilot
+        # Les champs de distance ne servent qu'au pilote automatique : sans lui, aucun tableau de la taille du labyrinthe.
+        if field_cache is None and autopilot:
+            if labyrinth.width * labyrinth.height <= PURSUIT_FULL_FIELD_CELLS:
+                radius = None
+            field_cache = DistanceFieldCache(labyrinth, radius=radius)
+        self.field_cache = field_cache
+        self.headings = numpy.zeros(len(self.pursuers), dtype=numpy.int64)
+        # Fixé au premier tick d'après les positions de départ : des personnages partis de la même case
+        # ne déclenchent le son qu'après s'être une première fois éloignés.
+        self.in_contact = None
+        self.contacts = 0
+        self._target_cell = None
+        self._field = None
+
+    def target_field(self, x, y, exited):
+        if exited[self.target]:
+            target_cell = self.labyrinth.end_position
+        else:
+            target_cell = (int(x[self.target]) // PATH_SIZE, int(y[self.target]) // PATH_SIZE)
+        if target_cell != self._target_cell:
+            self._target_cell = target_cell
+            self._field = self.field_cache.field(target_cell)
+        return self._field
+
+    def steer(self, x, y, exited, inputs):
+        # Remplace les entrées des poursuivants par le pas qui les rapproche de la cible.
+        inputs = numpy.array(inputs, dtype=numpy.int64)
+        if not self.autopilot:
+            return inputs
+        field = self.target_field(x, y, exited)
+        open_cells = lambda cell_x, cell_y: self.labyrinth.open_mask[cell_x, cell_y]
+        pursuer_x, pursuer_y = x[self.pursuers], y[self.pursuers]
+        keys = descent_keys(lambda cell_x, cell_y: field[cell_x, cell_y], open_cells, pursuer_x, pursuer_y, *field.shape)
+        # Hors du champ borné, la main droite sur le mur ; dans le champ, la direction suivie sert de cap au prochain repli.
+        outside = field[pursuer_x // PATH_SIZE, pursuer_y // PATH_SIZE] < 0
+        if outside.any():
+            follow_keys, headings = wall_follow_keys(open_cells, pursuer_x, pursuer_y, self.headings)
+            keys = numpy.where(outside, follow_keys, keys)
+            self.headings = numpy.where(outside, headings, self.headings)
+        descending = ~outside & (keys != 0)
+        self.headings = numpy.where(descending, (keys[:, None] == CLOCKWISE_MOVES).argmax(axis=1), self.headings)
+        inputs[self.pursuers] = numpy.where(exited[self.pursuers], inputs[self.pursuers], keys)
+        return inputs
+
+    def contact_cues(self, x, y, exited, game_time):
+        # Arguments des SoundEvent de capture, une seule fois par contact : le son ne se réarme qu'une fois
+        # le poursuivant éloigné de deux cases, pour ne pas se répéter quand il colle au fils.
+        distance = numpy.maximum(numpy.abs(x[self.pursuers] - x[self.target]), numpy.abs(y[self.pursuers] - y[self.target]))
+        present = ~exited[self.pursuers] & ~exited[self.target]
+        contact = present & (distance < PATH_SIZE)
+        apart = ~present | (distance >= 2 * PATH_SIZE)
+        if self.in_contact is None:
+            self.in_contact = contact
+        caught = numpy.flatnonzero(contact & ~self.in_contact)
+        self.in_contact = (self.in_contact & ~apart) | contact
+        self.contacts += len(caught)
+        return [
+            (game_time, CAUGHT_SOUND_PATH, CAUGHT_VOLUME, pursuer_x / SCREEN_WIDTH, None, CAUGHT_PRIORITY)
+            for pursuer_x in x[self.pursuers[caught]].tolist()
+        ]
+
+
+class Simulation:
+    # État d'une partie : un labyrinthe, ses personnages, le chronomètre et l'issue (victoire ou fin de partie).
+    # Chaque tick renvoie les arguments des SoundEvent à jouer, sans rien connaître de l'affichage ni de l'audio.
+    def __init__(self, labyrinth, characters, game_over_timeout=GAME_OVER_TIMEOUT):
+        self.labyrinth = labyrinth
+        self.characters = characters
+        self.game_over_timeout = game_over_timeout
+
+        self.ticks = 0
+        self.game_time = 0.0
+        self.remaining_time = game_over_timeout
+        self.game_running = True
+        self.game_won = False
+        self.game_over = False
+        self.profiler = None # FrameProfiler optionnel, seulement quand le profilage est actif
+        self.pursuit = None # Pursuit optionnelle : son de capture et pilote automatique des poursuivants
+        self.inputs = None # Entrées effectivement appliquées au dernier tick, pilote automatique compris
+
+    @classmethod
+    def create(cls, seed=None, width=LABYRINTH_WIDTH, height=LABYRINTH_HEIGHT, character_ids=("son", "father"), algorithm=None, **kwargs):
+        # Partie sans affichage : tous les personnages partent de l'entrée du labyrinthe.
+        # Un labyrinthe par morceaux n'est pas assemblé : seuls les morceaux parcourus sont générés.
+        if algorithm == "chunked":
+            labyrinth = ChunkedLabyrinthModel(width, height, seed)
+        else:
+            labyrinth = LabyrinthModel(width, height, seed, algorithm)
+        return cls(labyrinth, cls.create_characters(labyrinth, character_ids), **kwargs)
+
+    @staticmethod
+    def create_characters(labyrinth, character_ids):
+        return [CharacterModel(labyrinth.start_position, labyrinth, character_id) for character_id in character_ids]
+
+    def tick(self, inputs, game_time=None):
+        # inputs contient une combinaison de MOVE_* par personnage. Sans game_time, le temps de jeu avance
+        # d'une image à FPS par tick, ce qui rend la simulation déterministe.
+        if not self.game_running:
+            return []
+
+        self.ticks += 1
+        self.game_time = current_game_time = self.ticks / FPS if game_time is None else game_time
+        pursuit = self.pursuit
+        if pursuit is not None:
+            inputs = pursuit.steer(*self.character_state(), inputs)
+        self.inputs = inputs
+        sound_cues = self.step_characters(inputs, current_game_time)
+        if pursuit is not None:
+            sound_cues += pursuit.contact_cues(*self.character_state(), current_game_time)
+
+        self.remaining_time = max(0, int(self.game_over_timeout - current_game_time))
+
+        all_exited, any_exited = self.exit_state()
+        if all_exited and not self.game_won:
+            sound_cues.append((current_game_time, VICTORY_SOUND_PATH, 1.0, 0.5, None, OUTCOME_PRIORITY))
+            self.game_won = True
+            self.game_running = False
+
+        if current_game_time > self.game_over_timeout and not any_exited and not self.game_won:
+            sound_cues.append((current_game_time, GAME_OVER_SOUND_PATH, 1.0, 0.5, None, OUTCOME_PRIORITY))
+            self.game_running = False
+            self.game_over = True
+
+        return sound_cues
+
+    def step_characters(self, inputs, game_time):
+        sound_cues = []
+        profiler = self.profiler
+        for character, keys in zip(self.characters, inputs):
+            if profiler is None:
+                stepped = character.step(keys)
+            else:
+                with profiler.span(f"{character.character_id}.update"):
+                    stepped = character.step(keys)
+            if stepped:
+                sound_cues.append(character.footstep_cue(game_time))
+        return sound_cues
+
+    def exit_state(self):
+        # (tous les personnages sont sortis, au moins un est sorti)
+        exited = [character.exited for character in self.characters]
+        return all(exited), any(exited)
+
+    def character_state(self):
+        # Positions en pixels et drapeaux de sortie de tous les personnages, en tableaux.
+        characters = self.characters
+        return (
+            numpy.array([character.x for character in characters]),
+            numpy.array([character.y for character in characters]),
+            numpy.array([character.exited for character in characters]),
+        )
+
+
+class SwarmSimulation(Simulation):
+    # Même partie, mais les personnages forment un CharacterSwarm avancé en un seul pas vectorisé par tick :
+    # inputs peut alors être un tableau numpy d'une combinaison de MOVE_* par personnage.
+    @staticmethod
+    def create_characters(labyrinth, character_ids):
+        return CharacterSwarm(labyrinth.start_position, labyrinth, character_ids)
+
+    def step_characters(self, inputs, game_time):
+        if self.profiler is None:
+            stepped = self.characters.step(inputs)
+        else:
+            with self.profiler.span("characters.update"):
+                stepped = self.characters.step(inputs)
+        return self.characters.footstep_cues(stepped, game_time)
+
+    def exit_state(self):
+        exited = self.characters.exited
+        return bool(exited.all()), bool(exited.any())
+
+    def character_state(self):
+        characters = self.characters
+        return characters.x, characters.y, characters.exited
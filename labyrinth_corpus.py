@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Génération hors ligne d'un corpus de labyrinthes sur un pool de processus, sans pyxel.
+
+Chaque labyrinthe est généré par LabyrinthModel, analysé par labyrinth_analysis puis rangé dans un seul
+fichier .npz : murs en bits empaquetés (un bit par case) concaténés avec leur index de début, et une colonne
+par mesure de difficulté.
+
+    python labyrinth_corpus.py --count 10000 --sizes 39x27 79x55 --output corpus.npz
+"""
+
+import argparse
+import multiprocessing
+import os
+import time
+
+import numpy
+
+from labyrinth_analysis import LabyrinthAnalysis
+from labyrinth_core import ALGORITHMS, LABYRINTH_HEIGHT, LABYRINTH_WIDTH, LabyrinthModel, default_algorithm
+
+# Mesures de LabyrinthAnalysis.metrics conservées dans le corpus, avec leur type numpy.
+METRICS = (
+    ("solution_length", numpy.int32),
+    ("estimated_time_s", numpy.float32),
+    ("path_cells", numpy.int32),
+    ("dead_ends", numpy.int32),
+    ("junctions", numpy.int32),
+    ("decisions", numpy.int32),
+    ("branching_factor", numpy.float32),
+    ("max_distance", numpy.int32),
+)
+
+
+def generate_maze(task):
+    # Tâche d'un processus du pool : (graine, largeur, hauteur, code d'algorithme) -> (murs empaquetés, mesures).
+    seed, width, height, algorithm = task
+    labyrinth = LabyrinthModel(width, height, seed, ALGORITHMS[algorithm])
+    metrics = LabyrinthAnalysis(labyrinth).metrics
+    return numpy.packbits(labyrinth.labyrinth_array).tobytes(), tuple(metrics[name] for name, _ in METRICS)
+
+
+def corpus_tasks(first_seed, count, sizes, algorithm):
+    # count graines consécutives pour chaque taille, dans cet ordre ; sans algorithme, celui par défaut de chaque taille.
+    return [
+        (seed, width, height, ALGORITHMS.index(algorithm or default_algorithm(width, height)))
+        for width, height in sizes
+        for seed in range(first_seed, first_seed + count)
+    ]
+
+
+def generate_corpus(tasks, workers=None, chunksize=None):
+    # Répartit les tâches par paquets sur workers processus ; l'ordre du corpus reste celui des tâches.
+    workers = workers or os.cpu_count() or 1
+    if chunksize is None:
+        chunksize = max(1, len(tasks) // (workers * 8))
+    if workers == 1:
+        results = list(map(generate_maze, tasks))
+    else:
+        with multiprocessing.Pool(workers) as pool:
+            results = pool.map(generate_maze, tasks, chunksize)
+
+    tasks = numpy.array(tasks, dtype=numpy.uint64).reshape(-1, 4)
+    walls = [packed for packed, _ in results]
+    offsets = numpy.zeros(len(walls) + 1, dtype=numpy.int64)
+    offsets[1:] = numpy.cumsum([len(packed) for packed in walls])
+    corpus = {
+        "seeds": tasks[:, 0],
+        "widths": tasks[:, 1].astype(numpy.uint16),
+        "heights": tasks[:, 2].astype(numpy.uint16),
+        "algorithms": tasks[:, 3].astype(numpy.uint8),
+        "offsets": offsets,
+        "walls": numpy.frombuffer(b"".join(walls), dtype=numpy.uint8),
+    }
+    for column, (name, dtype) in enumerate(METRICS):
+        corpus[name] = numpy.array([values[column] for _, values in results], dtype=dtype)
+    return corpus
+
+
+def save_corpus(path, corpus):
+    # Non compressé : les bits empaquetés se compressent mal et le fichier se relit sans décompression.
+    numpy.savez(path, **corpus)
+
+
+def load_corpus(path):
+    with numpy.load(path) as corpus_file:
+        return {name: corpus_file[name] for name in corpus_file.files}
+
+
+def maze_array(corpus, index):
+    # Tableau des murs (largeur, hauteur) du labyrinthe index, comme LabyrinthModel.labyrinth_array.
+    width, height = int(corpus["widths"][index]), int(corpus["heights"][index])
+    packed = corpus["walls"][corpus["offsets"][index]:corpus["offsets"][index + 1]]
+    return numpy.unpackbits(packed, count=width * height).astype(bool).reshape(width, height)
+
+
+def parse_size(text):
+    width, height = text.lower().split("x")
+    return int(width), int(height)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Génère et analyse un corpus de labyrinthes sur plusieurs processus.")
+    parser.add_argument("--count", type=int, default=1000, help="labyrinthes par taille")
+    parser.add_argument("--first-seed", type=int, default=0, help="première graine, les suivantes sont consécutives")
+    parser.add_argument("--sizes", nargs="+", default=[f"{LABYRINTH_WIDTH}x{LABYRINTH_HEIGHT}"], help="tailles LARGEURxHAUTEUR")
+    parser.add_argument("--algorithm", choices=ALGORITHMS, help="générateur, par défaut selon la taille (default_algorithm)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="processus de génération")
+    parser.add_argument("--output", default="corpus.npz", help="fichier .npz de sortie")
+    args = parser.parse_args()
+
+    tasks = corpus_tasks(args.first_seed, args.count, [parse_size(size) for size in args.sizes], args.algorithm)
+    start = time.perf_counter()
+    corpus = generate_corpus(tasks, args.workers)
+    elapsed = time.perf_counter() - start
+    save_corpus(args.output, corpus)
+    print(f"{len(tasks)} labyrinthes en {elapsed:.2f} s sur {args.workers} processus ({len(tasks) / elapsed:.0f}/s), "
+          f"{corpus['walls'].nbytes} octets de murs : {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Moteur de parties en lot, sans pyxel ni audio, pour les joueurs automatiques (équilibrage, tests d'endurance).
+
+N parties indépendantes, chacune avec son labyrinthe et ses personnages, avancent ensemble d'un seul pas vectorisé
+par tick à partir d'un tenseur d'entrées (N, joueurs, 4) : droite, gauche, haut, bas. Victoire et fin de partie
+suivent les règles de Simulation.tick. Les graines se répartissent sur plusieurs processus :
+
+    python labyrinth_sessions.py --sessions 10000 --bot exit --workers 4
+"""
+
+import argparse
+import multiprocessing
+import os
+import time
+
+import numpy
+
+from labyrinth_core import (
+    FPS,
+    GAME_OVER_TIMEOUT,
+    LABYRINTH_HEIGHT,
+    LABYRINTH_WIDTH,
+    MOVE_DOWN,
+    MOVE_LEFT,
+    MOVE_RIGHT,
+    MOVE_UP,
+    CharacterSwarm,
+    DistanceFieldCache,
+    LabyrinthModel,
+    descent_keys,
+)
+
+# Bits MOVE_* dans l'ordre du dernier axe du tenseur d'entrées.
+INPUT_BITS = numpy.array((MOVE_RIGHT, MOVE_LEFT, MOVE_UP, MOVE_DOWN), dtype=numpy.int64)
+# Traces gardées par personnage : un lot de milliers de parties ne garde que les plus récentes.
+SESSION_TRACE_CAPACITY = 64
+
+
+class SessionSwarm(CharacterSwarm):
+    # Personnages de toutes les parties d'un lot : chacun lit les murs du labyrinthe de sa partie dans le masque
+    # empilé (parties, largeur, hauteur). Tous les labyrinthes ont la même taille, donc la même entrée et la même sortie.
+    def __init__(self, open_masks, labyrinth, players, trace_capacity=SESSION_TRACE_CAPACITY):
+        sessions = len(open_masks)
+        super().__init__(labyrinth.start_position, labyrinth, range(sessions * players), trace_capacity=trace_capacity)
+        self.flat_masks = open_masks.ravel()
+        width, height = open_masks.shape[1:]
+        self.session_offsets = numpy.repeat(numpy.arange(sessions, dtype=numpy.int64) * width * height, players)
+
+    def open_cells(self, x, y):
+        return self.flat_masks[self.session_offsets + x * self.labyrinth.height + y]
+
+
+class SessionBatch:
+    # État de N parties de players personnages partis de l'entrée : positions dans un SessionSwarm, issue par partie.
+    def __init__(self, seeds, width=LABYRINTH_WIDTH, height=LABYRINTH_HEIGHT, players=2, algorithm=None,
+                 game_over_timeout=GAME_OVER_TIMEOUT):
+        self.seeds = numpy.asarray(seeds, dtype=numpy.uint64)
+        self.players = players
+        self.game_over_timeout = game_over_timeout
+        self.labyrinths = [LabyrinthModel(width, height, int(seed), algorithm) for seed in self.seeds.tolist()]
+        self.open_masks = numpy.stack([labyrinth.open_mask for labyrinth in self.labyrinths])
+        self.characters = SessionSwarm(self.open_masks, self.labyrinths[0], players)
+
+        sessions = len(self.seeds)
+        self.ticks = 0
+        self.game_time = 0.0
+        self.running = numpy.ones(sessions, dtype=bool)
+        self.won = numpy.zeros(sessions, dtype=bool)
+        self.over = numpy.zeros(sessions, dtype=bool)
+        self.end_ticks = numpy.zeros(sessions, dtype=numpy.int64) # Tick de la victoire ou de la fin de partie
+        self.footsteps = numpy.zeros(sessions, dtype=numpy.int64) # Bruits de pas, par partie
+        self.character_steps = 0 # Pas de personnage joués, parties terminées exclues : mesure du débit
+
+    def __len__(self):
+        return len(self.seeds)
+
+    @property
+    def positions(self):
+        # Positions (N, joueurs) en pixels et drapeaux de sortie, comme Simulation.character_state par partie.
+        shape = (len(self), self.players)
+        characters = self.characters
+        return characters.x.reshape(shape), characters.y.reshape(shape), characters.exited.reshape(shape)
+
+    def step(self, inputs):
+        # Avance toutes les parties d'un tick. inputs est un tenseur (N, joueurs, 4) de booléens (droite, gauche,
+        # haut, bas) ; les parties terminées ne bougent plus, comme App.update qui ne les fait plus avancer.
+        keys = (numpy.asarray(inputs, dtype=numpy.int64) * INPUT_BITS).sum(axis=2)
+        keys[~self.running] = 0
+        self.character_steps += int(self.running.sum()) * self.players
+        stepped = self.characters.step(keys.ravel())
+        self.footsteps += stepped.reshape(len(self), self.players).sum(axis=1)
+
+        self.ticks += 1
+        self.game_time = self.ticks / FPS
+        exited = self.characters.exited.reshape(len(self), self.players)
+        all_exited = exited.all(axis=1)
+        won = self.running & all_exited
+        over = self.running & ~all_exited & ~exited.any(axis=1) & (self.game_time > self.game_over_timeout)
+        ended = won | over
+        self.won |= won
+        self.over |= over
+        self.end_ticks[ended] = self.ticks
+        self.running &= ~ended
+        return ended
+
+    def run(self, bot, max_ticks=None):
+        # Fait jouer bot (bot(lot) -> tenseur d'entrées) jusqu'à la fin de toutes les parties ou max_ticks ticks.
+        if max_ticks is None:
+            max_ticks = int(self.game_over_timeout * FPS) + 1
+        while self.running.any() and self.ticks < max_ticks:
+            self.step(bot(self))
+        return self.summary()
+
+    def summary(self):
+        return {
+            "seeds": self.seeds,
+            "won": self.won,
+            "over": self.over,
+            "end_ticks": self.end_ticks,
+            "footsteps": self.footsteps,
+        }
+
+
+def keys_to_inputs(keys):
+    # Combinaisons de MOVE_* (N, joueurs) -> tenseur d'entrées (N, joueurs, 4).
+    return (numpy.asarray(keys, dtype=numpy.int64)[..., None] & INPUT_BITS) != 0
+
+
+class RandomBot:
+    # Joueur au hasard : une direction tirée pour chaque personnage, gardée hold ticks.
+    def __init__(self, seed=None, hold=10):
+        self.rng = numpy.random.default_rng(seed)
+        self.hold = hold
+        self.inputs = None
+
+    def __call__(self, batch):
+        if self.inputs is None or batch.ticks % self.hold == 0:
+            directions = self.rng.integers(0, 4, size=(len(batch), batch.players))
+            self.inputs = numpy.eye(4, dtype=bool)[directions]
+        return self.inputs
+
+
+class ExitBot:
+    # Joueur qui file vers la sortie : descente des champs de distance à la sortie de chaque labyrinthe, empilés.
+    def __init__(self, batch):
+        self.fields = numpy.stack([
+            DistanceFieldCache(labyrinth).distance_field(labyrinth.end_position) for labyrinth in batch.labyrinths
+        ]).ravel()
+
+    def __call__(self, batch):
+        characters = batch.characters
+        width, height = batch.open_masks.shape[1:]
+        offsets = characters.session_offsets
+        keys = descent_keys(
+            lambda cell_x, cell_y: self.fields[offsets + cell_x * height + cell_y],
+            characters.open_cells,
+            characters.x,
+            characters.y,
+            width,
+            height,
+        )
+        return keys_to_inputs(keys.reshape(len(batch), batch.players))
+
+
+BOTS = ("random", "exit")
+
+
+def run_shard(task):
+    # Tâche d'un processus du pool : (graines, largeur, hauteur, bot, graine du bot) -> résumé du lot.
+    seeds, width, height, bot_name, bot_seed = task
+    batch = SessionBatch(seeds, width, height)
+    bot = ExitBot(batch) if bot_name == "exit" else RandomBot(bot_seed)
+    summary = batch.run(bot)
+    summary["character_steps"] = batch.character_steps
+    return summary
+
+
+def run_sessions(seeds, width=LABYRINTH_WIDTH, height=LABYRINTH_HEIGHT, bot="random", workers=None, shard_size=None):
+    # Répartit les graines en lots sur workers processus ; les résumés sont recollés dans l'ordre des graines.
+    workers = workers or os.cpu_count() or 1
+    seeds = numpy.asarray(seeds, dtype=numpy.uint64)
+    shard_size = shard_size or max(1, -(-len(seeds) // workers))
+    tasks = [(seeds[start:start + shard_size], width, height, bot, start) for start in range(0, len(seeds), shard_size)]
+    if workers == 1:
+        results = list(map(run_shard, tasks))
+    else:
+        with multiprocessing.Pool(workers) as pool:
+            results = pool.map(run_shard, tasks)
+    summary = {name: numpy.concatenate([result[name] for result in results]) for name in ("seeds", "won", "over", "end_ticks", "footsteps")}
+    summary["character_steps"] = sum(result["character_steps"] for result in results)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fait jouer des joueurs automatiques sur de nombreuses parties à la fois.")
+    parser.add_argument("--sessions", type=int, default=1000, help="nombre de parties")
+    parser.add_argument("--first-seed", type=int, default=0, help="graine de la première partie, les suivantes sont consécutives")
+    parser.add_argument("--size", default=f"{LABYRINTH_WIDTH}x{LABYRINTH_HEIGHT}", help="taille LARGEURxHAUTEUR")
+    parser.add_argument("--bot", default="random", choices=BOTS)
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="processus")
+    args = parser.parse_args()
+
+    width, height = map(int, args.size.lower().split("x"))
+    seeds = numpy.arange(args.first_seed, args.first_seed + args.sessions)
+    start = time.perf_counter()
+    summary = run_sessions(seeds, width, height, args.bot, args.workers)
+    elapsed = time.perf_counter() - start
+
+    won = summary["won"]
+    print(f"{args.sessions} parties en {elapsed:.2f} s sur {args.workers} processus, "
+          f"{summary['character_steps'] / elapsed / 1e6:.2f} M pas de personnage/s")
+    print(f"victoires {int(won.sum())}, fins de partie {int(summary['over'].sum())}, "
+          f"en cours {int((~won & ~summary['over']).sum())}")
+    if won.any():
+        print(f"temps de victoire médian {numpy.median(summary['end_ticks'][won]) / FPS:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
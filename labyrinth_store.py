@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Magasin de labyrinthes pré-générés, lu par projection mémoire pour un démarrage sans génération.
+
+Un fichier contient des labyrinthes d'une même taille, triés par graine : un en-tête, les graines, le temps
+de parcours estimé de chacun, puis un enregistrement de taille fixe par labyrinthe (murs en bits empaquetés
+et tuiles de la carte sur 4 bits, index dans TILE_PALETTE). Trouver un labyrinthe ne lit que son enregistrement.
+
+    python labyrinth_corpus.py --count 100000 --output corpus.npz
+    python labyrinth_store.py corpus.npz --output labyrinths.store
+"""
+
+import argparse
+import struct
+import time
+
+import numpy
+
+from labyrinth_core import ALGORITHMS, LABYRINTH_HEIGHT, LABYRINTH_TO_MAP_SCALE, LABYRINTH_WIDTH, WALL_TILES, LabyrinthModel
+
+MAGIC = b"SHMZ"
+VERSION = 1
+# magic, version, algorithme, largeur, hauteur, nombre de labyrinthes ; complété à HEADER_SIZE octets
+HEADER = struct.Struct("<4sBBHHQ")
+HEADER_SIZE = 64
+
+# Toutes les tuiles que produit LabyrinthModel.build_tiles : murs, coins des diagonales ouvertes et chemin (0, 0).
+TILE_PALETTE = numpy.unique(numpy.concatenate((WALL_TILES, [(6, 0), (7, 0), (6, 1), (7, 1), (0, 0)])).astype(numpy.uint16), axis=0)
+TILE_CODES = numpy.full(256, 255, dtype=numpy.uint8) # u * 16 + v -> index dans TILE_PALETTE
+TILE_CODES[TILE_PALETTE[:, 0] * 16 + TILE_PALETTE[:, 1]] = numpy.arange(len(TILE_PALETTE))
+
+
+def record_layout(width, height):
+    # Octets des murs et des tuiles dans l'enregistrement d'un labyrinthe de cette taille.
+    tile_count = width * height * LABYRINTH_TO_MAP_SCALE ** 2
+    return (width * height + 7) // 8, (tile_count + 1) // 2
+
+
+def encode_tiles(tiles):
+    codes = TILE_CODES[tiles[..., 0].astype(numpy.intp) * 16 + tiles[..., 1]].ravel()
+    if (codes == 255).any():
+        raise ValueError("Tuile absente de TILE_PALETTE")
+    if len(codes) % 2:
+        codes = numpy.append(codes, 0)
+    return (codes[0::2] << 4) | codes[1::2]
+
+
+def decode_tiles(packed, width, height):
+    # Tuiles (2 * largeur, 2 * hauteur, 2) prêtes pour la tilemap, décodées depuis les quartets de l'enregistrement.
+    map_width, map_height = width * LABYRINTH_TO_MAP_SCALE, height * LABYRINTH_TO_MAP_SCALE
+    codes = numpy.empty(len(packed) * 2, dtype=numpy.uint8)
+    codes[0::2] = packed >> 4
+    codes[1::2] = packed & 15
+    return TILE_PALETTE[codes[:map_width * map_height]].reshape(map_width, map_height, 2)
+
+
+class MazeStore:
+    # Vue en lecture seule d'un magasin : seeds, estimated_time_s et records sont des numpy.memmap,
+    # seules les pages des labyrinthes effectivement lus sont chargées par le système.
+    def __init__(self, path):
+        with open(path, "rb") as store_file:
+            magic, version, algorithm, width, height, count = HEADER.unpack(store_file.read(HEADER.size))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"Magasin de labyrinthes invalide : {path}")
+        self.path = path
+        self.algorithm = ALGORITHMS[algorithm]
+        self.width = width
+        self.height = height
+        self.wall_bytes, self.tile_bytes = record_layout(width, height)
+
+        offset = HEADER_SIZE
+        self.seeds = numpy.memmap(path, dtype="<u8", mode="r", offset=offset, shape=(count,))
+        offset += self.seeds.nbytes
+        self.estimated_time_s = numpy.memmap(path, dtype="<f4", mode="r", offset=offset, shape=(count,))
+        offset += self.estimated_time_s.nbytes
+        self.records = numpy.memmap(path, dtype=numpy.uint8, mode="r", offset=offset, shape=(count, self.wall_bytes + self.tile_bytes))
+        self.rng = numpy.random.default_rng()
+
+    def __len__(self):
+        return len(self.seeds)
+
+    def index_of(self, seed):
+        index = int(numpy.searchsorted(self.seeds, seed))
+        if index < len(self.seeds) and self.seeds[index] == seed:
+            return index
+        return None
+
+    def random_index(self, rng=None, max_time=None):
+        # Un labyrinthe tiré au hasard, éventuellement parmi ceux qui se parcourent en moins de max_time secondes.
+        # None si aucun ne convient (magasin vide ou max_time trop court) : l'appelant génère alors le sien.
+        rng = rng if rng is not None else self.rng
+        if max_time is None:
+            candidates = numpy.arange(len(self))
+        else:
+            candidates = numpy.flatnonzero(self.estimated_time_s <= max_time)
+        if not len(candidates):
+            return None
+        return int(candidates[rng.integers(len(candidates))])
+
+    def maze_array(self, index):
+        walls = self.records[index, :self.wall_bytes]
+        return numpy.unpackbits(walls, count=self.width * self.height).astype(bool).reshape(self.width, self.height)
+
+    def tiles(self, index):
+        return decode_tiles(self.records[index, self.wall_bytes:], self.width, self.height)
+
+
+def build_store(path, corpus, width=LABYRINTH_WIDTH, height=LABYRINTH_HEIGHT):
+    # Écrit dans path les labyrinthes width x height d'un corpus (labyrinth_corpus.load_corpus), triés par graine.
+    # Les enregistrements sont écrits au fil de l'eau : la mémoire ne dépend pas de la taille du magasin.
+    from labyrinth_corpus import maze_array
+
+    selected = numpy.flatnonzero((corpus["widths"] == width) & (corpus["heights"] == height))
+    algorithms = numpy.unique(corpus["algorithms"][selected])
+    if len(algorithms) > 1:
+        raise ValueError("Un magasin ne contient qu'un algorithme de génération")
+    selected = selected[numpy.argsort(corpus["seeds"][selected], kind="stable")]
+
+    with open(path, "wb") as store_file:
+        algorithm = int(algorithms[0]) if len(algorithms) else 0
+        store_file.write(HEADER.pack(MAGIC, VERSION, algorithm, width, height, len(selected)).ljust(HEADER_SIZE, b"\0"))
+        store_file.write(corpus["seeds"][selected].astype("<u8").tobytes())
+        store_file.write(corpus["estimated_time_s"][selected].astype("<f4").tobytes())
+        for index in selected:
+            labyrinth_array = maze_array(corpus, index)
+            tiles = LabyrinthModel.build_tiles(LabyrinthModel.build_open_mask(labyrinth_array))
+            store_file.write(numpy.packbits(labyrinth_array).tobytes())
+            store_file.write(encode_tiles(tiles).tobytes())
+    return len(selected)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Construit un magasin de labyrinthes à partir d'un corpus .npz.")
+    parser.add_argument("corpus", help="corpus produit par labyrinth_corpus.py")
+    parser.add_argument("--size", default=f"{LABYRINTH_WIDTH}x{LABYRINTH_HEIGHT}", help="taille LARGEURxHAUTEUR à retenir")
+    parser.add_argument("--output", default="labyrinths.store", help="fichier du magasin")
+    args = parser.parse_args()
+
+    from labyrinth_corpus import load_corpus
+
+    width, height = map(int, args.size.lower().split("x"))
+    start = time.perf_counter()
+    count = build_store(args.output, load_corpus(args.corpus), width, height)
+    print(f"{count} labyrinthes {width}x{height} en {time.perf_counter() - start:.2f} s : {args.output}")
+
+
+if __name__ == "__main__":
+    main()
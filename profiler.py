@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Profileur d'images optionnel : durées par zone nommée et par image, statistiques glissantes
+et export au format Chrome trace (chrome://tracing, Perfetto) ou JSON.
+
+Désactivé, span() renvoie un gestionnaire de contexte vide partagé : le coût se limite à un appel.
+StartupTimer mesure de la même façon les phases du démarrage, sur le thread principal comme sur celui de chargement.
+"""
+
+import collections
+import json
+import threading
+import time
+
+import numpy
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("profiler", "name", "start_ns")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start_ns = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.profiler.record(self.name, self.start_ns, time.perf_counter_ns())
+        return False
+
+
+class FrameProfiler:
+    def __init__(self, enabled=False, window=300, max_events=100_000):
+        self.enabled = enabled
+        self.window = window
+        self.frames = collections.deque(maxlen=window) # Durées par zone (s) des dernières images terminées
+        self.events = collections.deque(maxlen=max_events) # (nom, début ns, durée ns) pour l'export
+        self.frame_count = 0
+        self._current = {}
+        self._origin_ns = time.perf_counter_ns()
+
+    def span(self, name):
+        if not self.enabled:
+            return NULL_SPAN
+        return _Span(self, name)
+
+    def record(self, name, start_ns, end_ns):
+        duration_ns = end_ns - start_ns
+        self._current[name] = self._current.get(name, 0.0) + duration_ns / 1_000_000_000
+        self.events.append((name, start_ns - self._origin_ns, duration_ns))
+
+    def end_frame(self):
+        if not self.enabled:
+            return
+        self.frames.append(self._current)
+        self._current = {}
+        self.frame_count += 1
+
+    def stats(self):
+        # p50/p99/moyenne/max par zone sur la fenêtre glissante, en secondes.
+        durations = collections.defaultdict(list)
+        for frame in self.frames:
+            for name, duration in frame.items():
+                durations[name].append(duration)
+
+        stats = {}
+        for name, values in durations.items():
+            values = numpy.array(values)
+            p50, p99 = numpy.percentile(values, (50, 99))
+            stats[name] = {
+                "frames": len(values),
+                "p50_s": float(p50),
+                "p99_s": float(p99),
+                "mean_s": float(values.mean()),
+                "max_s": float(values.max()),
+            }
+        return stats
+
+    def export_chrome_trace(self, path):
+        trace_events = [
+            {"name": name, "ph": "X", "ts": start_ns / 1000, "dur": duration_ns / 1000, "pid": 0, "tid": 0}
+            for name, start_ns, duration_ns in self.events
+        ]
+        with open(path, "w") as trace_file:
+            json.dump({"traceEvents": trace_events, "displayTimeUnit": "ms"}, trace_file)
+
+    def export_json(self, path):
+        with open(path, "w") as stats_file:
+            json.dump({"frames": self.frame_count, "window": len(self.frames), "spans": self.stats()}, stats_file, indent=2)
+
+
+class StartupTimer:
+    # Phases du démarrage (nom, début et durée en ns depuis origin_ns, thread) et instants marqués, comme la
+    # première image affichée ou la partie prête. Les phases peuvent se chevaucher sur plusieurs threads.
+    def __init__(self, origin_ns=None):
+        self.origin_ns = origin_ns if origin_ns is not None else time.perf_counter_ns()
+        self.phases = []
+        self.marks = {}
+
+    def phase(self, name):
+        return _Span(self, name)
+
+    def record(self, name, start_ns, end_ns):
+        self.phases.append((name, start_ns - self.origin_ns, end_ns - start_ns, threading.current_thread().name))
+
+    def mark(self, name):
+        # Seul le premier passage compte.
+        self.marks.setdefault(name, time.perf_counter_ns() - self.origin_ns)
+
+    def summary(self):
+        # Durées des phases et instants marqués, en secondes.
+        return {
+            "phases": {name: duration_ns / 1_000_000_000 for name, _, duration_ns, _ in self.phases},
+            "marks": {name: offset_ns / 1_000_000_000 for name, offset_ns in self.marks.items()},
+        }
+
+    def report(self):
+        phases = ", ".join(f"{name} {duration_ns / 1_000_000:.0f} ms ({thread})" for name, _, duration_ns, thread in self.phases)
+        marks = ", ".join(f"{name} à {offset_ns / 1_000_000:.0f} ms" for name, offset_ns in self.marks.items())
+        return f"démarrage : {phases} ; {marks}"
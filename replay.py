@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Enregistrement et rejeu déterministes des entrées d'une partie.
+
+Le journal contient la graine du labyrinthe puis, pour chaque image, l'état des touches
+de chaque personnage (bits MOVE_*) sur un quartet : un octet par image pour le fils et le père.
+Rejoué dans labyrinth_core.Simulation, il redonne les mêmes positions, traces et SoundEvent.
+"""
+
+import argparse
+import struct
+import time
+
+import numpy
+
+from labyrinth_core import ALGORITHMS, FPS, Pursuit, Simulation
+
+MAGIC = b"SHRP"
+VERSION = 2
+# magic, version, graine, largeur, hauteur, nombre de personnages, algorithme de génération, drapeaux FLAG_*
+HEADER = struct.Struct("<4sBQHHBBB")
+# Version 1 : sans drapeaux, toujours relue comme une partie sans pilote automatique.
+HEADER_V1 = struct.Struct("<4sBQHHBB")
+FLAG_FATHER_AI = 1 # Le père suivait le fils en pilote automatique : poursuite et son de capture sont rebranchés
+# Le journal est vidé sur disque toutes les FLUSH_FRAMES images : une fermeture brutale n'en perd qu'une seconde.
+FLUSH_FRAMES = FPS
+
+
+def frame_size(character_count):
+    return (character_count + 1) // 2
+
+
+class InputRecorder:
+    # Écrit les entrées image par image dans un fichier tamponné ; à fermer en fin de partie.
+    def __init__(self, path, seed, width, height, character_count=2, algorithm="backtracker", father_ai=False):
+        self.character_count = character_count
+        self.frames = 0
+        self._file = open(path, "wb")
+        flags = FLAG_FATHER_AI if father_ai else 0
+        self._file.write(HEADER.pack(MAGIC, VERSION, seed, width, height, character_count, ALGORITHMS.index(algorithm), flags))
+
+    def write(self, inputs):
+        frame = bytearray(frame_size(self.character_count))
+        for index, keys in enumerate(inputs):
+            frame[index // 2] |= (keys & 0x0F) << (4 * (index % 2))
+        self._file.write(frame)
+        self.frames += 1
+        if self.frames % FLUSH_FRAMES == 0:
+            self._file.flush()
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class InputLog:
+    # Journal chargé en mémoire : les images sont décodées en un tableau (images, personnages) de bits MOVE_*.
+    def __init__(self, seed, width, height, inputs, algorithm="backtracker", father_ai=False):
+        self.seed = seed
+        self.width = width
+        self.height = height
+        self.algorithm = algorithm
+        self.father_ai = father_ai
+        self.inputs = inputs
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as log_file:
+            data = log_file.read()
+        magic, version = data[:4], data[4] if len(data) > 4 else None
+        if magic != MAGIC or version not in (1, VERSION):
+            raise ValueError(f"Journal d'entrées invalide : {path}")
+        header = HEADER if version == VERSION else HEADER_V1
+        _, _, seed, width, height, character_count, algorithm, *flags = header.unpack_from(data)
+        flags = flags[0] if flags else 0
+
+        frames = numpy.frombuffer(data, dtype=numpy.uint8, offset=header.size)
+        frames = frames[:len(frames) // frame_size(character_count) * frame_size(character_count)]
+        frames = frames.reshape(-1, frame_size(character_count))
+        nibbles = numpy.stack((frames & 0x0F, frames >> 4), axis=2).reshape(len(frames), -1)
+        return cls(seed, width, height, nibbles[:, :character_count], ALGORITHMS[algorithm], bool(flags & FLAG_FATHER_AI))
+
+    def __len__(self):
+        return len(self.inputs)
+
+    def __iter__(self):
+        return iter(self.inputs.tolist())
+
+    def simulation(self, **kwargs):
+        # Les journaux du jeu contiennent déjà les entrées du pilote automatique du père : seul le son de capture
+        # est rebranché, comme dans App, et seulement pour une partie jouée avec le pilote automatique.
+        simulation = Simulation.create(self.seed, self.width, self.height, algorithm=self.algorithm, **kwargs)
+        if self.father_ai and self.inputs.shape[1] == 2:
+            simulation.pursuit = Pursuit(simulation.labyrinth, target=0, pursuers=(1,))
+        return simulation
+
+
+def replay(log, realtime=False):
+    # Rejoue le journal dans une simulation sans affichage, à FPS images par seconde ou aussi vite que possible.
+    # Renvoie la simulation finale et la liste des arguments de SoundEvent produits.
+    simulation = log.simulation()
+    sound_cues = []
+    next_frame_time = time.perf_counter()
+    for inputs in log:
+        if not simulation.game_running:
+            break
+        sound_cues.extend(simulation.tick(inputs))
+        if realtime:
+            next_frame_time += 1 / FPS
+            time.sleep(max(0, next_frame_time - time.perf_counter()))
+    return simulation, sound_cues
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rejoue un journal d'entrées sans affichage.")
+    parser.add_argument("log", help="journal produit par baptiste_delagorce.py --record")
+    parser.add_argument("--realtime", action="store_true", help="rejoue à la vitesse du jeu au lieu d'aussi vite que possible")
+    args = parser.parse_args()
+
+    log = InputLog.load(args.log)
+    start = time.perf_counter()
+    simulation, sound_cues = replay(log, args.realtime)
+    elapsed = time.perf_counter() - start
+
+    print(f"graine {log.seed}, {simulation.ticks} ticks en {elapsed:.3f} s ({simulation.ticks / max(elapsed, 1e-9):.0f} ticks/s)")
+    for character in simulation.characters:
+        print(f"{character.character_id}: position ({character.x}, {character.y}), {len(character.traces)} traces, sorti {character.exited}")
+    print(f"{len(sound_cues)} événements sonores, victoire {simulation.game_won}, fin de partie {simulation.game_over}")
+
+
+if __name__ == "__main__":
+    main()
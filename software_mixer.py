@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Mixer logiciel en numpy, sortie alternative à pygame.mixer pour AudioPlayer, et rendu hors temps réel
+d'une partie enregistrée vers un fichier WAV, sans périphérique audio :
+
+    python software_mixer.py partie.shrp --output partie.wav
+
+Les SoundEvent passent par le même AudioPlayer qu'en jeu (canaux par personnage, pool général, panoramique,
+ducking de l'ambiance) ; seule l'horloge change : c'est le nombre d'échantillons déjà mixés.
+"""
+
+import argparse
+import math
+import time
+import wave
+
+import numpy
+
+from labyrinth_core import AMBIENT_VOLUME, CAUGHT_SOUND_PATH, FOOTSTEP_SOUND_PATHS, GAME_OVER_SOUND_PATH, VICTORY_SOUND_PATH
+
+FREQUENCY = 44100
+BLOCK_SIZE = 1024
+
+
+def read_wav(path, frequency=FREQUENCY):
+    # WAV PCM 8, 16 ou 32 bits, converti en float32 stéréo (images, 2) et rééchantillonné linéairement.
+    with wave.open(path, "rb") as wav_file:
+        channel_count, sample_width, source_frequency, frame_count = wav_file.getparams()[:4]
+        data = wav_file.readframes(frame_count)
+
+    if sample_width == 1:
+        samples = (numpy.frombuffer(data, dtype=numpy.uint8).astype(numpy.float32) - 128) / 128
+    elif sample_width == 2:
+        samples = numpy.frombuffer(data, dtype="<i2").astype(numpy.float32) / 32768
+    elif sample_width == 4:
+        samples = numpy.frombuffer(data, dtype="<i4").astype(numpy.float32) / 2 ** 31
+    else:
+        raise wave.Error(f"Format d'échantillon non pris en charge ({sample_width} octets) : {path}")
+
+    samples = samples.reshape(-1, channel_count)
+    if channel_count == 1:
+        samples = numpy.repeat(samples, 2, axis=1)
+    else:
+        samples = samples[:, :2]
+
+    if source_frequency != frequency and len(samples):
+        length = round(len(samples) * frequency / source_frequency)
+        positions = numpy.arange(length) * (source_frequency / frequency)
+        source_positions = numpy.arange(len(samples))
+        samples = numpy.stack([numpy.interp(positions, source_positions, samples[:, side]) for side in (0, 1)], axis=1)
+    return numpy.ascontiguousarray(samples, dtype=numpy.float32)
+
+
+class MixerSound:
+    # Son décodé, même interface que pygame.mixer.Sound pour AudioPlayer et SoundCache.
+    def __init__(self, samples, frequency=FREQUENCY):
+        self.samples = samples
+        self.frequency = frequency
+        self.volume = 1.0
+
+    def get_length(self):
+        return len(self.samples) / self.frequency
+
+    def set_volume(self, volume):
+        self.volume = volume
+
+    def get_volume(self):
+        return self.volume
+
+
+class MixerChannel:
+    # Voix du mixer : un son en cours, sa position en images et un volume par côté, comme pygame.mixer.Channel.
+    def __init__(self):
+        self.sound = None
+        self.position = 0
+        self.loops = 0
+        self.left = 1.0
+        self.right = 1.0
+
+    def play(self, sound, loops=0):
+        self.sound = sound
+        self.position = 0
+        self.loops = loops
+
+    def stop(self):
+        self.sound = None
+
+    def get_busy(self):
+        return self.sound is not None
+
+    def set_volume(self, left, right=None):
+        self.left = left
+        self.right = left if right is None else right
+
+    def mix_into(self, output):
+        # Ajoute la suite du son au bloc output (images, 2) par tranches contiguës, en rebouclant selon loops.
+        offset = 0
+        while self.sound is not None and offset < len(output):
+            samples = self.sound.samples
+            if not len(samples):
+                self.sound = None
+                break
+            count = min(len(output) - offset, len(samples) - self.position)
+            gain = numpy.array((self.left, self.right), dtype=numpy.float32) * self.sound.volume
+            output[offset:offset + count] += samples[self.position:self.position + count] * gain
+            offset += count
+            self.position += count
+            if self.position >= len(samples):
+                self.position = 0
+                if self.loops == 0:
+                    self.sound = None
+                elif self.loops > 0:
+                    self.loops -= 1
+
+
+class SoftwareMixerBackend:
+    # Sortie de AudioPlayer sans pygame : les voix sont additionnées bloc par bloc dans des tampons numpy.
+    # La musique d'ambiance est une voix à part, comme le flux musique de pygame.mixer.
+    load_errors = (OSError, EOFError, wave.Error)
+
+    def __init__(self, frequency=FREQUENCY, channel_count=8):
+        self.frequency = frequency
+        self.channels = [MixerChannel() for _ in range(channel_count)]
+        self.music = MixerChannel()
+        self.music_sound = None
+        self.frames = 0 # Images déjà mixées : l'horloge du rendu
+
+    def load_sound(self, path):
+        return MixerSound(read_wav(path, self.frequency), self.frequency)
+
+    def sound_size(self, sound):
+        return sound.samples.nbytes
+
+    def set_num_channels(self, count):
+        del self.channels[count:]
+        self.channels.extend(MixerChannel() for _ in range(count - len(self.channels)))
+
+    def get_num_channels(self):
+        return len(self.channels)
+
+    def channel(self, index):
+        return self.channels[index]
+
+    def load_music(self, path):
+        self.music_sound = self.load_sound(path)
+
+    def play_music(self, loops=-1):
+        if self.music_sound is not None:
+            self.music.play(self.music_sound, loops)
+
+    def set_music_volume(self, volume):
+        self.music.set_volume(volume)
+
+    def stop_music(self):
+        self.music.stop()
+
+    def is_music_playing(self):
+        return self.music.get_busy()
+
+    def clock(self):
+        return self.frames / self.frequency
+
+    def mix(self, frame_count):
+        output = numpy.zeros((frame_count, 2), dtype=numpy.float32)
+        for channel in self.channels:
+            channel.mix_into(output)
+        self.music.mix_into(output)
+        self.frames += frame_count
+        return output
+
+
+def to_pcm16(block):
+    return (numpy.clip(block, -1.0, 1.0) * 32767).astype("<i2")
+
+
+def render(player, duration, wav_file=None, block_size=BLOCK_SIZE, ambient_until=None):
+    # Fait avancer player (AudioPlayer sur un SoftwareMixerBackend, horloge backend.clock) jusqu'à duration,
+    # sans thread ni attente. Les blocs sont coupés aux timestamps des événements, aux paliers du ducking
+    # et à l'arrêt de l'ambiance : chaque son démarre à l'échantillon près.
+    # Écrit le PCM 16 bits dans wav_file (ouvert par wave) ou le renvoie en tableau (images, 2).
+    backend = player.backend
+    scheduler = player.audio_queue
+    total_frames = round(duration * backend.frequency)
+    blocks = []
+    while backend.frames < total_frames:
+        now = backend.clock()
+        if ambient_until is not None and now >= ambient_until:
+            player.stop_ambient()
+            ambient_until = None
+        delays = [player.update_ambient_ducking(now)]
+        for sound_event in scheduler.get_due(backend.clock, 0):
+            player.play_event(sound_event)
+
+        next_timestamp = scheduler.next_timestamp()
+        delays += [None if next_timestamp is None else next_timestamp - now, None if ambient_until is None else ambient_until - now]
+        frame_count = min(block_size, total_frames - backend.frames)
+        for delay in delays:
+            if delay is not None:
+                frame_count = min(frame_count, max(1, math.ceil(delay * backend.frequency)))
+
+        pcm = to_pcm16(backend.mix(frame_count))
+        if wav_file is not None:
+            wav_file.writeframes(pcm.tobytes())
+        else:
+            blocks.append(pcm)
+    if wav_file is None:
+        return numpy.concatenate(blocks) if blocks else numpy.zeros((0, 2), dtype="<i2")
+
+
+def render_session(log, output_path, ambient_path=None, block_size=BLOCK_SIZE, tail=2.0):
+    # Rejoue un journal d'entrées sans affichage puis rend tout l'audio de la partie dans output_path :
+    # pas, victoire ou fin de partie, et ambiance (WAV) coupée à la fin de la partie comme dans App.update.
+    # Renvoie la simulation finale et le lecteur, pour sa télémétrie.
+    from audio_manager import AudioPlayer, SoundCache, SoundEvent, SoundScheduler
+    from replay import replay
+
+    simulation, sound_cues = replay(log)
+
+    backend = SoftwareMixerBackend()
+    sound_cache = SoundCache(backend=backend)
+    sound_cache.preload(FOOTSTEP_SOUND_PATHS + [VICTORY_SOUND_PATH, GAME_OVER_SOUND_PATH, CAUGHT_SOUND_PATH])
+    # Tous les événements de la partie sont en file dès le départ : aucun ne doit en remplacer un autre.
+    scheduler = SoundScheduler(coalesce=False)
+    player = AudioPlayer(scheduler, sound_cache, clock=backend.clock)
+    if ambient_path is not None:
+        player.start_ambient(ambient_path, AMBIENT_VOLUME)
+    for sound_cue in sound_cues:
+        scheduler.put(SoundEvent(*sound_cue))
+
+    ambient_until = None if simulation.game_running else simulation.game_time
+    with wave.open(output_path, "wb") as wav_file:
+        wav_file.setnchannels(2)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(backend.frequency)
+        render(player, simulation.game_time + tail, wav_file, block_size, ambient_until)
+    return simulation, player
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rend l'audio d'une partie enregistrée dans un fichier WAV, plus vite que le temps réel.")
+    parser.add_argument("log", help="journal produit par baptiste_delagorce.py --record")
+    parser.add_argument("--output", default="session.wav", help="fichier WAV de sortie")
+    # L'ambiance du jeu est en FLAC, que read_wav ne décode pas : sans --ambient, la partie est rendue sans ambiance.
+    parser.add_argument("--ambient", help="piste d'ambiance, au format WAV")
+    parser.add_argument("--block-size", type=int, default=BLOCK_SIZE, help="taille maximale d'un bloc de mixage, en images")
+    args = parser.parse_args()
+    if args.ambient is not None:
+        try:
+            wave.open(args.ambient, "rb").close()
+        except SoftwareMixerBackend.load_errors as error:
+            parser.error(f"piste d'ambiance illisible ({error}) : {args.ambient}")
+
+    from replay import InputLog
+
+    log = InputLog.load(args.log)
+    start = time.perf_counter()
+    simulation, player = render_session(log, args.output, args.ambient, args.block_size)
+    elapsed = time.perf_counter() - start
+
+    duration = player.backend.clock()
+    print(f"{duration:.1f} s d'audio rendues en {elapsed:.3f} s ({duration / max(elapsed, 1e-9):.0f}x le temps réel) : {args.output}")
+    print(player.telemetry.snapshot())
+
+
+if __name__ == "__main__":
+    main()
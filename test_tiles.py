@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""
+Équivalence des tuiles vectorisées de LabyrinthModel.build_tiles avec l'ancien calcul tuile par tuile de draw_map :
+
+    python -m pytest test_tiles.py
+"""
+
+import numpy
+import pytest
+
+from labyrinth_core import LabyrinthModel
+
+# (haut, gauche, bas, droite) murés -> tuile de l'ancien draw_map ; quatre murs : coin selon la diagonale ouverte.
+REFERENCE_TILES = {
+    (False, False, False, False): (3, 0),
+    (False, False, False, True): (3, 0),
+    (False, False, True, False): (3, 0),
+    (False, False, True, True): (2, 0),
+    (False, True, False, False): (3, 0),
+    (False, True, False, True): (2, 0),
+    (False, True, True, False): (3, 0),
+    (False, True, True, True): (5, 0),
+    (True, False, False, False): (3, 0),
+    (True, False, True, False): (3, 0),
+    (True, False, False, True): (2, 1),
+    (True, False, True, True): (4, 0),
+    (True, True, False, False): (3, 1),
+    (True, True, False, True): (4, 1),
+    (True, True, True, False): (5, 1),
+}
+
+
+def reference_tiles(labyrinth_array):
+    # Portage de l'ancien draw_map : une tuile par case de la carte, les voisins hors de la grille comptent comme du chemin.
+    width, height = labyrinth_array.shape
+    tiles = numpy.zeros((width * 2, height * 2, 2), dtype=numpy.uint16)
+    for x in range(width * 2):
+        for y in range(height * 2):
+            labyrinth_x, labyrinth_y = x // 2, y // 2
+            if not labyrinth_array[labyrinth_x, labyrinth_y]:
+                continue
+            up_y, down_y = (y - 1) // 2, (y + 1) // 2
+            left_x, right_x = (x - 1) // 2, (x + 1) // 2
+            walls = (
+                up_y >= 0 and bool(labyrinth_array[labyrinth_x, up_y]),
+                left_x >= 0 and bool(labyrinth_array[left_x, labyrinth_y]),
+                down_y < height and bool(labyrinth_array[labyrinth_x, down_y]),
+                right_x < width and bool(labyrinth_array[right_x, labyrinth_y]),
+            )
+            if walls in REFERENCE_TILES:
+                tiles[x, y] = REFERENCE_TILES[walls]
+            elif not labyrinth_array[left_x, up_y]:
+                tiles[x, y] = (6, 0)
+            elif not labyrinth_array[right_x, up_y]:
+                tiles[x, y] = (7, 0)
+            elif not labyrinth_array[left_x, down_y]:
+                tiles[x, y] = (6, 1)
+            elif not labyrinth_array[right_x, down_y]:
+                tiles[x, y] = (7, 1)
+    return tiles
+
+
+def vectorized_tiles(labyrinth_array):
+    return LabyrinthModel.build_tiles(LabyrinthModel.build_open_mask(labyrinth_array))
+
+
+@pytest.mark.parametrize("algorithm", ["backtracker", "kruskal"])
+@pytest.mark.parametrize("seed", [0, 1, 42, 2025])
+def test_generated_labyrinths(seed, algorithm):
+    labyrinth_array = LabyrinthModel(39, 27, seed, algorithm).labyrinth_array
+    numpy.testing.assert_array_equal(vectorized_tiles(labyrinth_array), reference_tiles(labyrinth_array))
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_random_walls(seed):
+    # Murs tirés au hasard, bords compris : toutes les combinaisons de voisins et de diagonales apparaissent.
+    rng = numpy.random.default_rng(seed)
+    labyrinth_array = rng.random((int(rng.integers(1, 16)), int(rng.integers(1, 16)))) < rng.uniform(0.3, 0.9)
+    numpy.testing.assert_array_equal(vectorized_tiles(labyrinth_array), reference_tiles(labyrinth_array))